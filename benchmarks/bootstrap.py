@@ -0,0 +1,14 @@
+"""Подготовка окружения Django для скриптов из benchmarks/."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup():
+    for path in (ROOT, os.path.join(ROOT, 'yatube')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
@@ -0,0 +1,164 @@
+"""Скорость операций кэша: LocMemCache, FileBasedCache и SQLiteCache.
+
+Запуск из корня репозитория:
+
+    python benchmarks/cache_backends.py --ops 20000 --processes 4
+
+Сначала операции выполняются в одном процессе, затем get/set/incr
+одновременно в нескольких процессах — так работают воркеры gunicorn.
+LocMemCache в этом режиме не разделяется между процессами и приведен
+только для сравнения скорости.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bootstrap import setup  # noqa: E402
+
+VALUE = {'html': 'x' * 2000, 'versions': {'feed:index': 1}}
+
+
+def backends(directory):
+    return {
+        'locmem': (
+            'django.core.cache.backends.locmem.LocMemCache', 'bench'
+        ),
+        'filebased': (
+            'django.core.cache.backends.filebased.FileBasedCache',
+            os.path.join(directory, 'files'),
+        ),
+        'sqlite': (
+            'core.cache_backends.SQLiteCache',
+            os.path.join(directory, 'cache.sqlite3'),
+        ),
+    }
+
+
+def make_cache(backend, location, max_entries):
+    from django.utils.module_loading import import_string
+
+    return import_string(backend)(location, {
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': max_entries},
+    })
+
+
+def operations(cache, ops, worker=0):
+    keys = [f'key:{worker}:{number % 1000}' for number in range(ops)]
+    many = [keys[start:start + 10] for start in range(0, 1000, 10)]
+    cache.add('version', 0, timeout=None)
+    timings = {}
+
+    def timed(name, function, count):
+        started = time.perf_counter()
+        function()
+        timings[name] = count / (time.perf_counter() - started)
+
+    timed('set', lambda: [cache.set(key, VALUE) for key in keys], ops)
+    timed('get', lambda: [cache.get(key) for key in keys], ops)
+    timed('get_many(10)', lambda: [
+        cache.get_many(many[number % len(many)])
+        for number in range(ops // 10)
+    ], ops // 10)
+    timed('set_many(10)', lambda: [
+        cache.set_many({key: VALUE for key in many[number % len(many)]})
+        for number in range(ops // 10)
+    ], ops // 10)
+    timed('incr', lambda: [increment(cache) for _ in range(ops)], ops)
+    return timings
+
+
+def increment(cache):
+    # У FileBasedCache incr() — это get() и set(): между процессами ключ
+    # может на мгновение пропасть, а прибавки теряются.
+    try:
+        cache.incr('version')
+    except ValueError:
+        pass
+
+
+def worker(backend, location, max_entries, ops, number, results):
+    setup()
+    results.put(operations(
+        make_cache(backend, location, max_entries), ops, number
+    ))
+
+
+def parallel(backend, location, options):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    workers = [
+        context.Process(target=worker, args=(
+            backend, location, options.max_entries, options.ops, number,
+            results,
+        ))
+        for number in range(options.processes)
+    ]
+    for process in workers:
+        process.start()
+    timings = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    return {
+        name: sum(timing[name] for timing in timings)
+        for name in timings[0]
+    }
+
+
+def lost_increments(cache, options):
+    """Сколько incr() из всех процессов не дошли до общего счетчика."""
+    expected = options.processes * options.ops
+    return expected - (cache.get('version') or 0)
+
+
+def report(title, results):
+    print(f'\n=== {title}, операций в секунду ===')
+    names = list(dict.fromkeys(
+        name for timings in results.values() for name in timings
+    ))
+    print(f'{"":<14}' + ''.join(f'{name:>12}' for name in results))
+    for name in names:
+        print(f'{name:<14}' + ''.join(
+            f'{timings[name]:>12.0f}' if name in timings else f'{"-":>12}'
+            for timings in results.values()
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ops', type=int, default=20000)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--max-entries', type=int, default=100000)
+    options = parser.parse_args()
+
+    setup()
+    directory = tempfile.mkdtemp()
+    try:
+        single, shared = {}, {}
+        for name, (backend, location) in backends(directory).items():
+            cache = make_cache(backend, location, options.max_entries)
+            single[name] = operations(cache, options.ops)
+            cache.clear()
+            cache.set('version', 0, timeout=None)
+            shared[name] = parallel(backend, location, options)
+            if name != 'locmem':
+                # LocMemCache у каждого процесса свой, сравнивать не с чем
+                shared[name]['потеряно incr'] = lost_increments(
+                    cache, options
+                )
+            cache.clear()
+        report('Один процесс', single)
+        report(f'{options.processes} процесса(ов), суммарно', shared)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
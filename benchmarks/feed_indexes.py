@@ -0,0 +1,201 @@
+"""EXPLAIN QUERY PLAN и время запросов лент до и после составных индексов.
+
+Запуск из корня репозитория:
+
+    python benchmarks/feed_indexes.py --posts 200000
+
+База создается заново во временном файле (см. benchmarks/settings.py),
+наполняется синтетическими данными, после чего запросы лент
+выполняются на миграции без индексов и на миграции с ними.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bootstrap import setup  # noqa: E402
+
+BEFORE = '0015_counters'
+AFTER = '0016_feed_indexes'
+
+
+def seed(options):
+    from django.db import connection, transaction
+
+    rnd = random.Random(options.seed)
+    start = datetime(2020, 1, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (password, is_superuser, username, '
+            'first_name, last_name, email, is_staff, is_active, date_joined) '
+            "VALUES ('', 0, %s, '', '', '', 0, 1, %s)",
+            [(f'user{i}', start) for i in range(options.users)],
+        )
+        cursor.executemany(
+            'INSERT INTO posts_group (title, slug, description, posts_count) '
+            "VALUES (%s, %s, '', 0)",
+            [(f'Группа {i}', f'group-{i}') for i in range(options.groups)],
+        )
+        cursor.executemany(
+            'INSERT INTO posts_post (text, pub_date, author_id, group_id, '
+            "image, comments_count) VALUES (%s, %s, %s, %s, '', 0)",
+            [
+                (
+                    f'Пост {i}',
+                    start + timedelta(seconds=i * 7),
+                    rnd.randint(1, options.users),
+                    rnd.choice((None, rnd.randint(1, options.groups))),
+                )
+                for i in range(options.posts)
+            ],
+        )
+        cursor.executemany(
+            'INSERT INTO posts_comment (post_id, author_id, text, created) '
+            "VALUES (%s, %s, 'Комментарий', %s)",
+            [
+                (
+                    rnd.randint(1, options.posts),
+                    rnd.randint(1, options.users),
+                    start + timedelta(seconds=i),
+                )
+                for i in range(options.posts)
+            ],
+        )
+        follows = {
+            (user, author)
+            for user, author in (
+                (rnd.randint(1, options.users), rnd.randint(1, 50))
+                for _ in range(options.users * 20)
+            )
+            if user != author
+        }
+        cursor.executemany(
+            'INSERT INTO posts_follow (user_id, author_id) VALUES (%s, %s)',
+            sorted(follows),
+        )
+        cursor.execute(
+            'INSERT INTO posts_timelineentry (user_id, post_id, pub_date) '
+            'SELECT f.user_id, p.id, p.pub_date FROM posts_follow f '
+            'JOIN posts_post p ON p.author_id = f.author_id'
+        )
+        cursor.execute('ANALYZE')
+
+
+def feed_queries():
+    from django.db.models import F
+    from posts.models import Comment, Follow, Group, Post, User
+    from posts.utils import CursorPaginator
+
+    def page(queryset, **kwargs):
+        return CursorPaginator(queryset, 10, **kwargs).ordered()[:11]
+
+    def deep_page(queryset, **kwargs):
+        paginator = CursorPaginator(queryset, 10, **kwargs)
+        middle = paginator.ordered()[queryset.count() // 2]
+        return paginator.ordered().filter(
+            paginator.after(
+                getattr(middle, paginator.date_field),
+                getattr(middle, paginator.id_field),
+            )
+        )[:11]
+
+    author = User.objects.get(pk=1)
+    group = Group.objects.get(pk=1)
+    reader = Follow.objects.order_by('user').first().user
+    post = Comment.objects.order_by('post').first().post
+    timeline = Post.objects.for_feed().filter(
+        timeline_entries__user=reader
+    ).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_id=F('timeline_entries__post'),
+    )
+    timeline_keys = {'date_field': 'feed_date', 'id_field': 'feed_id'}
+    return {
+        'index': page(Post.objects.for_feed()),
+        'index (курсор)': deep_page(Post.objects.for_feed()),
+        'group_posts': page(group.posts.for_feed()),
+        'profile': page(author.posts.for_feed()),
+        'profile (курсор)': deep_page(author.posts.for_feed()),
+        'follow_index': page(timeline, **timeline_keys),
+        'follow_index (курсор)': deep_page(timeline, **timeline_keys),
+        'post_detail: комментарии': post.comments.for_post(),
+        'fan-out: подписчики': Follow.objects.filter(
+            author=author
+        ).values_list('user_id', flat=True),
+    }
+
+
+def measure(queryset, repeat):
+    from django.db import connection
+
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        plan = [row[-1] for row in cursor.fetchall()]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+    return plan, statistics.median(timings)
+
+
+def run(label, repeat):
+    results = {}
+    print(f'\n=== {label} ===')
+    for name, queryset in feed_queries().items():
+        plan, median = measure(queryset, repeat)
+        results[name] = median
+        print(f'\n{name}: {median:.2f} мс')
+        for step in plan:
+            print(f'    {step}')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--groups', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    options = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+
+    name = settings.DATABASES['default']['NAME']
+    if os.path.exists(name):
+        os.remove(name)
+    call_command('migrate', verbosity=0)
+    call_command('migrate', 'posts', BEFORE, verbosity=0)
+    print(f'Наполнение базы {name}: {options.posts} постов...')
+    seed(options)
+
+    before = run(f'До индексов ({BEFORE})', options.repeat)
+    call_command('migrate', 'posts', AFTER, verbosity=0)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    after = run(f'После индексов ({AFTER})', options.repeat)
+
+    print('\n=== Итог, медиана, мс ===')
+    width = max(len(name) for name in before)
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else 0
+        print(
+            f'{name:<{width}}  {before[name]:9.2f}  {after[name]:9.2f}'
+            f'  x{speedup:.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
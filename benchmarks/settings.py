@@ -0,0 +1,16 @@
+"""Настройки для бенчмарков: отдельная база, чтобы не трогать рабочую."""
+import os
+import tempfile
+
+from yatube.settings import *  # noqa: F401,F403
+from yatube.settings import CACHES, DATABASES
+
+DATABASES['default']['NAME'] = os.environ.get(
+    'BENCH_DB', os.path.join(tempfile.gettempdir(), 'yatube_bench.sqlite3')
+)
+
+if os.environ.get('BENCH_CACHE') == 'dummy':
+    # Замер самих view, а не попаданий в кэш
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
@@ -0,0 +1,337 @@
+"""Задержки и число запросов основных view на данных разного объема.
+
+Запуск из корня репозитория:
+
+    python benchmarks/views.py --scales 1000,100000 --requests 200 \\
+        --output views.json --baseline views_baseline.json
+
+Для каждого объема база наполняется командой generate_dataset с
+фиксированным seed в отдельном файле рядом с BENCH_DB и переиспользуется
+при следующих запусках (--regenerate создает ее заново). Запросы идут
+через тестовый клиент Django от имени пользователя с наибольшим числом
+подписок. По умолчанию кэш отключен (DummyCache) и измеряется работа
+самих view; --warm-cache оставляет LocMemCache из настроек.
+
+Результат — p50/p95/p99 в миллисекундах и медиана числа SQL-запросов.
+С --baseline каждая строка сравнивается с сохраненным прогоном, и при
+регрессии скрипт завершается с кодом 1. Эталон в репозитории не лежит:
+задержки зависят от машины, поэтому сначала он записывается на ней же
+из исходной ветки с теми же --scales и --requests:
+
+    python benchmarks/views.py --scales 1000,100000 --requests 200 \\
+        --baseline views_baseline.json --save-baseline
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bootstrap import setup  # noqa: E402
+
+END = datetime(2024, 1, 1, tzinfo=timezone.utc)
+VIEWS = (
+    'index',
+    'group_posts',
+    'profile',
+    'post_detail',
+    'follow_index',
+    'post_create',
+    'add_comment',
+)
+
+
+def database_path(scale):
+    from django.conf import settings
+
+    base, extension = os.path.splitext(
+        settings.DATABASES['default']['NAME']
+    )
+    return f'{base}_views_{scale}{extension}'
+
+
+def use_database(path):
+    from django.db import connection
+
+    connection.close()
+    connection.settings_dict['NAME'] = path
+
+
+def prepare(scale, options):
+    from django.core.management import call_command
+
+    path = database_path(scale)
+    if options.regenerate and os.path.exists(path):
+        os.remove(path)
+    use_database(path)
+    if os.path.exists(path):
+        return path
+    print(f'Наполнение {path}: {scale} постов...')
+    call_command('migrate', verbosity=0)
+    call_command(
+        'generate_dataset',
+        users=max(scale // 10, 100),
+        groups=50,
+        posts=scale,
+        comments=scale,
+        follows=20,
+        seed=options.seed,
+        end=END,
+        workers=options.workers,
+    )
+    return path
+
+
+class Targets:
+    """Бесконечные последовательности запросов к каждому view."""
+
+    def __init__(self, rnd):
+        from django.db.models import Count
+        from posts.models import Group, Post, User
+
+        self.rnd = rnd
+        self.reader = User.objects.annotate(
+            subscriptions=Count('follower')
+        ).order_by('-subscriptions', 'pk').first()
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.last_post = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )[0]
+        self.last_user = User.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )[0]
+
+    def random_post(self):
+        from posts.models import Post
+
+        post_id = None
+        while post_id is None:
+            post_id = Post.objects.filter(
+                pk__gte=self.rnd.randint(1, self.last_post)
+            ).order_by('pk').values_list('pk', flat=True).first()
+        return post_id
+
+    def random_username(self):
+        from posts.models import User
+
+        return User.objects.filter(
+            pk__gte=self.rnd.randint(1, self.last_user)
+        ).order_by('pk').values_list('username', flat=True).first()
+
+    def requests(self):
+        from django.urls import reverse
+
+        rnd = self.rnd
+        return {
+            'index': (
+                ('get', reverse('posts:index'), {'page': rnd.randint(1, 5)})
+                for _ in itertools.count()
+            ),
+            'group_posts': (
+                ('get', reverse(
+                    'posts:group_posts', args=(rnd.choice(self.slugs),)
+                ), {})
+                for _ in itertools.count()
+            ),
+            'profile': (
+                ('get', reverse(
+                    'posts:profile', args=(self.random_username(),)
+                ), {})
+                for _ in itertools.count()
+            ),
+            'post_detail': (
+                ('get', reverse(
+                    'posts:post_detail', args=(self.random_post(),)
+                ), {})
+                for _ in itertools.count()
+            ),
+            'follow_index': (
+                ('get', reverse('posts:follow_index'),
+                 {'page': rnd.randint(1, 5)})
+                for _ in itertools.count()
+            ),
+            'post_create': (
+                ('post', reverse('posts:post_create'), {
+                    'text': f'Пост из бенчмарка {number}',
+                    'group': '',
+                })
+                for number in itertools.count()
+            ),
+            'add_comment': (
+                ('post', reverse(
+                    'posts:add_comment', args=(self.random_post(),)
+                ), {'text': f'Комментарий из бенчмарка {number}'})
+                for number in itertools.count()
+            ),
+        }
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def measure(client, requests, count):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings, queries = [], []
+    for method, url, data in itertools.islice(requests, count):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{url}: ответ {response.status_code}')
+        queries.append(len(context))
+    return {
+        'p50': round(percentile(timings, 0.50), 3),
+        'p95': round(percentile(timings, 0.95), 3),
+        'p99': round(percentile(timings, 0.99), 3),
+        'queries': statistics.median_low(queries),
+    }
+
+
+def run_scale(scale, options):
+    from django.core.cache import cache
+    from django.test import Client
+    from posts.models import Comment, Post
+
+    prepare(scale, options)
+    cache.clear()
+    targets = Targets(random.Random(options.seed))
+    requests = targets.requests()
+    client = Client()
+    client.force_login(targets.reader)
+    results = {}
+    try:
+        for name in options.views:
+            # Прогрев: шаблоны, ContentType и соединение
+            measure(client, requests[name], options.warmup)
+            results[name] = measure(client, requests[name], options.requests)
+    finally:
+        # Записи коммитятся, как в работе, и удаляются после замера
+        Comment.objects.filter(
+            text__startswith='Комментарий из бенчмарка'
+        ).delete()
+        Post.objects.filter(text__startswith='Пост из бенчмарка').delete()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Строки отчета и число регрессий относительно эталона."""
+    lines, regressions = [], 0
+    for scale, views in results.items():
+        for name, current in views.items():
+            previous = baseline.get(scale, {}).get(name)
+            if previous is None:
+                continue
+            marks = []
+            if current['p95'] > previous['p95'] * threshold:
+                marks.append('p95')
+            if current['queries'] > previous['queries']:
+                marks.append('запросы')
+            regressions += bool(marks)
+            lines.append(
+                f'{scale:>8} {name:<13}'
+                f' p95 {previous["p95"]:8.2f} -> {current["p95"]:8.2f} мс'
+                f'  запросы {previous["queries"]:>4} -> '
+                f'{current["queries"]:>4}'
+                + (f'  РЕГРЕССИЯ: {", ".join(marks)}' if marks else '')
+            )
+    return lines, regressions
+
+
+def report(results):
+    print(f'\n{"объем":>8} {"view":<13}{"p50":>9}{"p95":>9}{"p99":>9}'
+          f'{"запросы":>9}')
+    for scale, views in results.items():
+        for name, row in views.items():
+            print(
+                f'{scale:>8} {name:<13}{row["p50"]:9.2f}{row["p95"]:9.2f}'
+                f'{row["p99"]:9.2f}{row["queries"]:9g}'
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--scales',
+        type=lambda value: [int(scale) for scale in value.split(',')],
+        default=[1000, 100000, 1000000],
+        help='Число постов через запятую.',
+    )
+    parser.add_argument('--views', type=lambda value: value.split(','),
+                        default=list(VIEWS))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--regenerate', action='store_true')
+    parser.add_argument('--warm-cache', action='store_true')
+    parser.add_argument('--output', help='Куда записать результаты JSON.')
+    parser.add_argument('--baseline', help='Эталонный JSON для сравнения.')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Записать результаты в --baseline.')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=1.25,
+        help='Во сколько раз p95 может вырасти без регрессии.',
+    )
+    options = parser.parse_args()
+
+    if not options.warm_cache:
+        os.environ['BENCH_CACHE'] = 'dummy'
+    setup()
+    from django.test.utils import setup_test_environment
+
+    # testserver в ALLOWED_HOSTS и почта в памяти, как в тестах
+    setup_test_environment()
+    results = {
+        str(scale): run_scale(scale, options) for scale in options.scales
+    }
+    report(results)
+    document = {
+        'meta': {
+            'requests': options.requests,
+            'seed': options.seed,
+            'warm_cache': options.warm_cache,
+            'python': sys.version.split()[0],
+        },
+        'results': results,
+    }
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as stream:
+            json.dump(document, stream, ensure_ascii=False, indent=2)
+    if not options.baseline:
+        return
+    if options.save_baseline:
+        with open(options.baseline, 'w', encoding='utf-8') as stream:
+            json.dump(document, stream, ensure_ascii=False, indent=2)
+        print(f'\nЭталон записан в {options.baseline}')
+        return
+    if not os.path.exists(options.baseline):
+        sys.exit(
+            f'Нет эталона {options.baseline}: запишите его тем же запуском '
+            'с --save-baseline на исходной ветке.'
+        )
+    with open(options.baseline, encoding='utf-8') as stream:
+        baseline = json.load(stream)['results']
+    lines, regressions = compare(results, baseline, options.threshold)
+    print(f'\n=== Сравнение с {options.baseline} ===')
+    print('\n'.join(lines))
+    if regressions:
+        print(f'\nРегрессий: {regressions}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+
+
+def initial_version():
+    # Версия, потерянная при вытеснении из кэша, не должна начаться
+    # заново с числа, под которым уже лежат старые фрагменты.
+    return int(time.time() * 1000)
+
+
+def get_versions(*names):
+    """Текущие версии именованных наборов данных одним запросом к кэшу."""
+    keys = {VERSION_KEY.format(name): name for name in names}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, initial_version(), None)
+        found[key] = cache.get(key)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump(*names):
+    """Делает устаревшим все, что закэшировано под этими версиями."""
+    for name in names:
+        key = VERSION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, initial_version(), None)
+
+
+def invalidate(*names):
+    """Сбрасывает версии сейчас и еще раз после коммита транзакции.
+
+    Повтор нужен, потому что конкурентный запрос мог успеть положить
+    в кэш старые данные под уже новой версией до коммита.
+    """
+    bump(*names)
+    transaction.on_commit(lambda: bump(*names))
+
+
+def add_cache_tags(request, *tags):
+    """Помечает страницу тегами для кэша страниц анонимных читателей.
+
+    Вне AnonymousPageCacheMiddleware ничего не делает.
+    """
+    if hasattr(request, 'cache_tags'):
+        add_cache_versions(request, get_versions(*tags))
+
+
+def add_cache_versions(request, versions):
+    """add_cache_tags() с уже прочитанными версиями тегов."""
+    if hasattr(request, 'cache_tags'):
+        request.cache_tags.update(versions)
@@ -0,0 +1,246 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+# Ограничение SQLite на число параметров в одном запросе
+CHUNK_SIZE = 500
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+    LOCATION — путь к файлу базы. Когда записей становится больше
+    MAX_ENTRIES, вытесняются давно не читанные (LRU). Целые числа
+    хранятся как INTEGER, поэтому incr()/decr() атомарны между процессами.
+
+    OPTIONS:
+        MAX_ENTRIES, CULL_FREQUENCY — как у остальных бэкендов Django;
+        CULL_EVERY — раз в сколько записей проверять размер (100);
+        TOUCH_INTERVAL — не чаще скольких секунд обновлять время
+        обращения к ключу при чтении (1.0).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._cull_every = int(options.get('CULL_EVERY', 100))
+        self._touch_interval = float(options.get('TOUCH_INTERVAL', 1.0))
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def _db(self):
+        # Соединение свое у каждого потока и у каждого процесса после fork
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            local.db = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            local.db.execute('PRAGMA journal_mode=WAL')
+            local.db.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                local.db.execute(statement)
+            local.pid = os.getpid()
+        return local.db
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _dump(value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _expires(self, timeout):
+        # Момент истечения (time.time()) или None, если ключ вечный
+        return self.get_backend_timeout(timeout)
+
+    def _read(self, keys):
+        """Живые значения ключей; заодно отмечает обращение к ним."""
+        now = time.time()
+        found, stale, touched = {}, [], []
+        for start in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[start:start + CHUNK_SIZE]
+            rows = self._db.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk,
+            )
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    stale.append((key,))
+                    continue
+                found[key] = value
+                if now - accessed > self._touch_interval:
+                    touched.append((now, key))
+        if stale or touched:
+            with self._transaction() as db:
+                db.executemany(
+                    'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                    [(key, now) for key, in stale],
+                )
+                db.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?', touched
+                )
+        return found
+
+    def _transaction(self):
+        return _Transaction(self._db)
+
+    def _written(self, count=1):
+        self._writes += count
+        if self._writes >= self._cull_every:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        with self._transaction() as db:
+            db.execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+            )
+            total, = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+            if total <= self._max_entries:
+                return
+            excess = total - self._max_entries
+            if self._cull_frequency:
+                excess += self._max_entries // self._cull_frequency
+            db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                ' SELECT key FROM cache ORDER BY accessed LIMIT ?'
+                ')',
+                (excess,),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        found = self._read([key])
+        if key not in found:
+            return default
+        return self._load(found[key])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._read(list(keys))
+        return {keys[key]: self._load(value) for key, value in found.items()}
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._read([key])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self._expires(timeout)
+        rows = [
+            (self._key(key, version), self._dump(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self._transaction() as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', rows
+            )
+        self._written(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        cursor = self._db.execute(
+            'INSERT INTO cache VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value,'
+            ' expires = excluded.expires, accessed = excluded.accessed '
+            'WHERE cache.expires <= ?',
+            (
+                self._key(key, version),
+                self._dump(value),
+                self._expires(timeout),
+                now,
+                now,
+            ),
+        )
+        added = cursor.rowcount > 0
+        if added:
+            self._written()
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), self._key(key, version), time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                'UPDATE cache SET value = value + ?, accessed = ? '
+                "WHERE key = ? AND typeof(value) = 'integer'"
+                ' AND (expires IS NULL OR expires > ?)',
+                (delta, now, key, now),
+            )
+            if not cursor.rowcount:
+                raise ValueError(f"Key '{key}' not found")
+            value, = db.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        rows = [(self._key(key, version),) for key in keys]
+        with self._transaction() as db:
+            db.executemany('DELETE FROM cache WHERE key = ?', rows)
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живет весь поток: Django вызывает close() после
+        # каждого запроса, а переоткрывать файл на каждый запрос дорого.
+        pass
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT: запись без гонок между процессами."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии лент и лимит профилирования держатся в кэше по умолчанию.
+
+    LocMemCache у каждого воркера свой: сброс версий не виден другим
+    процессам, а PROFILE_RATE_LIMIT считается отдельно в каждом.
+    """
+    if settings.CACHES['default']['BACKEND'] not in LOCAL_CACHES:
+        return []
+    return [Warning(
+        'Кэш по умолчанию свой у каждого процесса.',
+        hint=(
+            'При нескольких воркерах задайте YATUBE_CACHE_PATH, иначе '
+            'ленты устаревают, а лимит профилей умножается на число '
+            'воркеров.'
+        ),
+        id='core.W001',
+    )]
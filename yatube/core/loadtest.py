@@ -0,0 +1,172 @@
+"""Нагрузочный прогон прямо через WSGI-приложение, без HTTP-сервера.
+
+Виртуальные пользователи работают в потоках одного процесса (общий
+LocMemCache, одна база на все потоки) или в отдельных процессах, как
+воркеры gunicorn. Каждый пользователь ведет свои гистограммы задержек
+по именам URL, в конце они складываются.
+"""
+import logging
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from importlib import import_module
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+from wsgiref.util import setup_testing_defaults
+
+import django
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.db import connections
+from django.urls import resolve
+
+from .stats import Histogram
+
+
+class WSGIClient:
+    """Отправляет запросы в WSGI-приложение и хранит cookies."""
+
+    def __init__(self, application, host='localhost'):
+        self.application = application
+        self.host = host
+        self.cookies = {}
+
+    def login(self, user):
+        """Сессия пользователя без формы входа, как Client.force_login."""
+        engine = import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        self.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def request(self, method, url, data=None):
+        """Код ответа; тело читается целиком, как это сделал бы сервер."""
+        parts = urlsplit(url)
+        body = urlencode(data or {}).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': parts.path,
+            'QUERY_STRING': parts.query,
+            'HTTP_HOST': self.host,
+            'SERVER_NAME': self.host,
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+        }
+        if self.cookies:
+            environ['HTTP_COOKIE'] = '; '.join(
+                f'{name}={value}' for name, value in self.cookies.items()
+            )
+        setup_testing_defaults(environ)
+        status = []
+
+        def start_response(line, headers, exc_info=None):
+            status.append(int(line.split()[0]))
+            for name, value in headers:
+                if name.lower() == 'set-cookie':
+                    self.set_cookies(value)
+
+        result = self.application(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return status[0]
+
+    def set_cookies(self, header):
+        for name, morsel in SimpleCookie(header).items():
+            if morsel['max-age'] == '0':
+                self.cookies.pop(name, None)
+            else:
+                self.cookies[name] = morsel.value
+
+    def get(self, url, params=None):
+        if params:
+            url = f'{url}?{urlencode(params)}'
+        return self.request('GET', url)
+
+    def post(self, url, data):
+        """POST с токеном CSRF из cookie, полученной на странице формы."""
+        token = self.cookies.get(settings.CSRF_COOKIE_NAME, '')
+        return self.request(
+            'POST', url, {**data, 'csrfmiddlewaretoken': token}
+        )
+
+
+class Recorder:
+    """Задержки и ошибки одного виртуального пользователя."""
+
+    def __init__(self):
+        self.histograms = defaultdict(Histogram)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(int)
+
+    def call(self, method, url, *args):
+        url_name = resolve(urlsplit(url).path).url_name
+        name = f'{method.__name__.upper()} {url_name}'
+        started = time.perf_counter()
+        try:
+            status = method(url, *args)
+        except Exception as error:
+            status = type(error).__name__
+        self.histograms[name].record(time.perf_counter() - started)
+        self.statuses[status] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors[name] += 1
+        return status
+
+    def merge(self, other):
+        for name, histogram in other.histograms.items():
+            self.histograms[name].merge(histogram)
+        for name, count in other.errors.items():
+            self.errors[name] += count
+        for status, count in other.statuses.items():
+            self.statuses[status] += count
+        return self
+
+
+def run_user(function, number, deadline, options):
+    """Запускает пользователя и закрывает соединения его потока."""
+    # Ошибки считаются в отчете, трассировки каждой 500 не нужны
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    try:
+        return function(number, deadline, options)
+    finally:
+        connections.close_all()
+
+
+def run(function, users, duration, options, processes=False):
+    """Суммарный Recorder всех пользователей и фактическая длительность.
+
+    function(number, deadline, options) крутит сценарий пользователя
+    до deadline по time.time() и возвращает его Recorder. Для процессов
+    она должна импортироваться по имени модуля.
+    """
+    if processes:
+        executor = ProcessPoolExecutor(
+            max_workers=users,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+        # Запуск spawn-процессов не должен съедать время прогона
+        list(executor.map(time.sleep, [0] * users))
+    else:
+        executor = ThreadPoolExecutor(max_workers=users)
+    started = time.time()
+    deadline = started + duration
+    with executor:
+        futures = [
+            executor.submit(run_user, function, number, deadline, options)
+            for number in range(users)
+        ]
+        total = Recorder()
+        for future in futures:
+            total.merge(future.result())
+    return total, time.time() - started
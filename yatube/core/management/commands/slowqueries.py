@@ -0,0 +1,91 @@
+import os
+import textwrap
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.querylog import connect
+
+ORDERS = {
+    'total': 'total DESC',
+    'mean': 'total / count DESC',
+    'max': 'max DESC',
+    'count': 'count DESC',
+    'slow': 'slow DESC, total DESC',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Самые дорогие SQL-запросы view из журнала SLOW_QUERY_LOG: '
+        'отпечаток, время и план самого медленного выполнения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG,
+                            help='Файл журнала.')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--order',
+            choices=ORDERS,
+            default='total',
+            help='Суммарное, среднее или наибольшее время, число '
+                 'выполнений или медленных выполнений.',
+        )
+        parser.add_argument('--view', help='Только view с этим именем.')
+        parser.add_argument('--reset', action='store_true',
+                            help='Очистить журнал.')
+
+    def handle(self, *args, log, limit, order, view, reset, **options):
+        if not log or not os.path.exists(log):
+            raise CommandError(
+                'Журнала нет: задайте YATUBE_SLOW_QUERY_LOG и дайте '
+                'приложению поработать.'
+            )
+        db = connect(log)
+        try:
+            if reset:
+                with db:
+                    db.execute('DELETE FROM queries')
+                    db.execute('DELETE FROM samples')
+                self.stdout.write('Журнал очищен.')
+                return
+            rows = db.execute(
+                'SELECT q.fingerprint, q.view, q.count, q.total, q.max,'
+                ' q.slow, s.duration, s.params, s.plan, s.location,'
+                ' s.template '
+                'FROM queries q LEFT JOIN samples s'
+                ' ON s.fingerprint = q.fingerprint AND s.view = q.view '
+                'WHERE ? IS NULL OR q.view = ? '
+                f'ORDER BY {ORDERS[order]} LIMIT ?',
+                (view, view, limit),
+            ).fetchall()
+        finally:
+            db.close()
+        for rank, row in enumerate(rows, 1):
+            self.report(rank, *row)
+
+    def report(self, rank, fingerprint, view, count, total, longest, slow,
+               duration, params, plan, location, template):
+        self.stdout.write(
+            f'{rank:>3}. {view}: {count} раз, всего {total * 1000:.1f} мс, '
+            f'в среднем {total / count * 1000:.2f} мс, '
+            f'максимум {longest * 1000:.1f} мс, медленных {slow}'
+        )
+        self.stdout.write(textwrap.indent(
+            textwrap.fill(fingerprint, 75), '     '
+        ))
+        if duration is None:
+            self.stdout.write('')
+            return
+        self.stdout.write(f'     Самый медленный: {duration * 1000:.1f} мс')
+        for label, value in (
+            ('код', location),
+            ('шаблон', template),
+            ('параметры', params),
+        ):
+            if value:
+                self.stdout.write(f'     {label}: {value}')
+        if plan:
+            self.stdout.write(textwrap.indent(plan, '       | '))
+        self.stdout.write('')
@@ -0,0 +1,221 @@
+"""Метрики запросов: время, SQL, шаблоны и кэш по именам view.
+
+MetricsMiddleware собирает их для каждого запроса в RequestMetrics,
+отдает в заголовке Server-Timing и складывает в гистограммы процесса.
+/metrics показывает гистограммы в текстовом формате Prometheus. Каждый
+воркер ведет свои гистограммы, поэтому метрики — одного процесса.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache.backends.base import BaseCache
+from django.template.backends.django import DjangoTemplates, Template
+
+from .stats import Histogram
+
+PREFIX = 'yatube'
+QUANTILES = (50, 90, 95, 99)
+
+_local = threading.local()
+_lock = threading.Lock()
+_missing = object()
+
+
+class RequestMetrics:
+    """Счетчики одного запроса; сам служит execute_wrapper для SQL."""
+
+    __slots__ = ('queries', 'sql', 'template', 'hits', 'misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def server_timing(self, total):
+        return (
+            f'total;dur={total * 1000:.1f}, '
+            f'sql;dur={self.sql * 1000:.1f};desc="{self.queries} queries", '
+            f'template;dur={self.template * 1000:.1f}, '
+            f'cache;desc="{self.hits} hits {self.misses} misses"'
+        )
+
+
+def current():
+    """Метрики запроса, который обрабатывает этот поток, или None."""
+    return getattr(_local, 'metrics', None)
+
+
+def start():
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def finish():
+    _local.metrics = None
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.duration = Histogram()
+        self.sql = Histogram()
+        self.template = Histogram()
+        self.queries = 0
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, metrics, total):
+        self.duration.record(total)
+        self.sql.record(metrics.sql)
+        self.template.record(metrics.template)
+        self.queries += metrics.queries
+        self.hits += metrics.hits
+        self.misses += metrics.misses
+
+
+views = defaultdict(ViewMetrics)
+
+
+def record(view, metrics, total):
+    with _lock:
+        views[view].add(metrics, total)
+
+
+def reset():
+    with _lock:
+        views.clear()
+
+
+def escape(value):
+    return (
+        value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    )
+
+
+def summary_lines(name, help_text, view_histograms):
+    yield f'# HELP {PREFIX}_{name} {help_text}'
+    yield f'# TYPE {PREFIX}_{name} summary'
+    for view, histogram in view_histograms:
+        label = f'view="{escape(view)}"'
+        for quantile in QUANTILES:
+            yield (
+                f'{PREFIX}_{name}{{{label},quantile="{quantile / 100:g}"}} '
+                f'{histogram.percentile(quantile):.6f}'
+            )
+        yield f'{PREFIX}_{name}_sum{{{label}}} {histogram.sum / 1e6:.6f}'
+        yield f'{PREFIX}_{name}_count{{{label}}} {histogram.total}'
+
+
+def counter_lines(name, help_text, view_counts):
+    yield f'# HELP {PREFIX}_{name} {help_text}'
+    yield f'# TYPE {PREFIX}_{name} counter'
+    for view, count in view_counts:
+        yield f'{PREFIX}_{name}{{view="{escape(view)}"}} {count}'
+
+
+def exposition():
+    """Все метрики процесса в текстовом формате Prometheus 0.0.4."""
+    with _lock:
+        items = sorted(views.items())
+        lines = [
+            *summary_lines(
+                'request_duration_seconds', 'Время ответа.',
+                ((view, item.duration) for view, item in items),
+            ),
+            *summary_lines(
+                'request_sql_seconds', 'Время SQL-запросов за запрос.',
+                ((view, item.sql) for view, item in items),
+            ),
+            *summary_lines(
+                'request_template_seconds', 'Время рендеринга шаблонов.',
+                ((view, item.template) for view, item in items),
+            ),
+            *counter_lines(
+                'sql_queries_total', 'Число SQL-запросов.',
+                ((view, item.queries) for view, item in items),
+            ),
+            *counter_lines(
+                'cache_hits_total', 'Попадания в кэш.',
+                ((view, item.hits) for view, item in items),
+            ),
+            *counter_lines(
+                'cache_misses_total', 'Промахи кэша.',
+                ((view, item.misses) for view, item in items),
+            ),
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+def meter_cache(backend):
+    """Считает попадания и промахи get()/get_many() этого бэкенда.
+
+    Бэкенды кэша создаются отдельно в каждом потоке, поэтому методы
+    подменяются у экземпляра один раз при первом запросе потока.
+    """
+    if getattr(backend, 'metered', False):
+        return
+    get, get_many = backend.get, backend.get_many
+
+    def metered_get(key, default=None, version=None):
+        value = get(key, _missing, version)
+        metrics = current()
+        if metrics is not None:
+            if value is _missing:
+                metrics.misses += 1
+            else:
+                metrics.hits += 1
+        return default if value is _missing else value
+
+    def metered_get_many(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version)
+        metrics = current()
+        if metrics is not None:
+            metrics.hits += len(found)
+            metrics.misses += len(keys) - len(found)
+        return found
+
+    backend.get = metered_get
+    # BaseCache.get_many вызывает get() по каждому ключу, их уже посчитали
+    if type(backend).get_many is not BaseCache.get_many:
+        backend.get_many = metered_get_many
+    backend.metered = True
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django, которые засекают время render() для метрик.
+
+    Время включает SQL-запросы, выполненные из шаблона.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(
+            super().from_string(template_code).template, self
+        )
+
+    def get_template(self, template_name):
+        return TimedTemplate(
+            super().get_template(template_name).template, self
+        )
@@ -0,0 +1,202 @@
+import hashlib
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import Resolver404, resolve
+
+from . import metrics, profiling, templateprofile
+from .cache import get_versions
+from .nplusone import Detector, NPlusOneError, describe, logger
+from .querylog import QueryLog
+
+
+class MetricsMiddleware:
+    """Время, SQL, шаблоны и кэш каждого запроса по имени view.
+
+    Стоит раньше кэша страниц, чтобы учитывать и ответы из него, но
+    после ProfilingMiddleware и TemplateProfileMiddleware. Добавляет
+    заголовок Server-Timing и пополняет гистограммы для /metrics.
+    Отключается настройкой METRICS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.meter_cache(caches['default'])
+        request_metrics = metrics.start()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(request_metrics):
+                response = self.get_response(request)
+        finally:
+            metrics.finish()
+        total = time.perf_counter() - started
+        response['Server-Timing'] = request_metrics.server_timing(total)
+        metrics.record(self.view_name(request), request_metrics, total)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            # Ответ из кэша страниц отдается до разбора URL
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                return 'unresolved'
+        return match.view_name
+
+
+class ProfilingMiddleware:
+    """Запрос с меткой со страницы /profiles/ выполняется под cProfile.
+
+    Стоит первым, чтобы в профиль попал весь стек middleware. Имя
+    сохраненного профиля возвращается в заголовке X-Profile.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if profiling.requested(request) and profiling.allowed():
+            return profiling.capture(request, self.get_response)
+        return self.get_response(request)
+
+
+class TemplateProfileMiddleware:
+    """Профилирует шаблоны в доле TEMPLATE_PROFILE_RATE запросов.
+
+    Стоит перед MetricsMiddleware: самые долгие шаблоны и теги запроса
+    дописываются к ее заголовку Server-Timing. Суммы по всем запросам
+    показывает /metrics.
+    """
+
+    def __init__(self, get_response):
+        if not settings.TEMPLATE_PROFILE_RATE:
+            raise MiddlewareNotUsed
+        templateprofile.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.TEMPLATE_PROFILE_RATE:
+            return self.get_response(request)
+        profile = templateprofile.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            templateprofile.finish(profile)
+        timing = profile.server_timing(settings.TEMPLATE_PROFILE_TOP)
+        if timing:
+            previous = response.get('Server-Timing')
+            response['Server-Timing'] = (
+                f'{previous}, {timing}' if previous else timing
+            )
+        return response
+
+
+class QueryLogMiddleware:
+    """Пишет SQL-запросы view в журнал для manage.py slowqueries.
+
+    Включается путем к файлу журнала в SLOW_QUERY_LOG.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.log = QueryLog(
+            settings.SLOW_QUERY_LOG,
+            settings.SLOW_QUERY_THRESHOLD,
+            settings.SLOW_QUERY_FLUSH_INTERVAL,
+        )
+
+    def __call__(self, request):
+        with connection.execute_wrapper(self.log.wrapper(request)):
+            response = self.get_response(request)
+        self.log.maybe_flush()
+        return response
+
+
+class NPlusOneMiddleware:
+    """Сообщает о запросах с N+1, включается NPLUSONE_THRESHOLD.
+
+    С NPLUSONE_RAISE вместо записи в лог бросает NPlusOneError, так
+    тесты падают на новом N+1.
+    """
+
+    def __init__(self, get_response):
+        if settings.NPLUSONE_THRESHOLD is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        detector = Detector(settings.NPLUSONE_THRESHOLD)
+        with connection.execute_wrapper(detector):
+            response = self.get_response(request)
+        problems = detector.problems()
+        if problems:
+            match = request.resolver_match
+            message = describe(
+                match.view_name if match else request.path, problems
+            )
+            if settings.NPLUSONE_RAISE:
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэширует целые страницы для анонимных читателей.
+
+    Стоит до сессий и аутентификации, чтобы попадание в кэш обходилось
+    без них. Страница кэшируется, только если view пометила ее тегами
+    через add_cache_tags; сброс любого тега делает копию устаревшей.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.is_anonymous_read(request):
+            return self.get_response(request)
+        key = self.page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            tags, response = cached
+            if get_versions(*tags) == tags:
+                return response
+        request.cache_tags = {}
+        response = self.get_response(request)
+        if request.cache_tags and self.is_cacheable(response):
+            cache.set(
+                key, (request.cache_tags, response), settings.PAGE_CACHE_TTL
+            )
+        return response
+
+    @staticmethod
+    def is_anonymous_read(request):
+        return (
+            request.method == 'GET'
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+
+    @staticmethod
+    def is_cacheable(response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and 'private' not in response.get('Cache-Control', '')
+        )
+
+    @staticmethod
+    def page_key(request):
+        url = request.build_absolute_uri().encode()
+        return 'page:' + hashlib.md5(url).hexdigest()
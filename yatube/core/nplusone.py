@@ -0,0 +1,55 @@
+"""Поиск N+1: один и тот же SQL-запрос много раз за HTTP-запрос.
+
+Обычно это шаблон, который в цикле обращается к связи, не загруженной
+через select_related или prefetch_related. NPlusOneMiddleware считает
+отпечатки запросов (core.querylog.fingerprint) и сообщает о тех, что
+выполнились больше NPLUSONE_THRESHOLD раз, вместе со строкой шаблона и
+кода, где случилось первое лишнее выполнение.
+"""
+import logging
+from collections import Counter
+
+from .querylog import callers, fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class Detector:
+    """execute_wrapper, который считает отпечатки запросов."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.places = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold + 1:
+            self.places[key] = callers()
+        return execute(sql, params, many, context)
+
+    def problems(self):
+        """(число выполнений, отпечаток, код, шаблон) по убыванию числа."""
+        return sorted(
+            (
+                (self.counts[key], key, *place)
+                for key, place in self.places.items()
+            ),
+            reverse=True,
+        )
+
+
+def describe(view, problems):
+    lines = [f'N+1 в {view}:']
+    for count, key, location, template in problems:
+        lines.append(f'  {count} раз: {key}')
+        if template:
+            lines.append(f'    шаблон: {template}')
+        if location:
+            lines.append(f'    код: {location}')
+    return '\n'.join(lines)
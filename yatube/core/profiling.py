@@ -0,0 +1,150 @@
+"""Профиль cProfile одного запроса по требованию сотрудника.
+
+Страница /profiles/ выдает сотруднику подписанную метку. С ней в
+параметре ?__profile= или в cookie запрос выполняется под cProfile, а
+в PROFILE_ROOT (вне MEDIA_ROOT, который раздается всем) сохраняются
+.prof для snakeviz/pstats и .txt с первыми PROFILE_TOP функциями.
+В метке лежит id сотрудника, и профиль снимается, только пока он
+активен и is_staff. Профилируется лишь доля PROFILE_SAMPLE_RATE
+помеченных запросов и не больше PROFILE_RATE_LIMIT за
+PROFILE_RATE_WINDOW секунд, так что даже утекшая метка не позволит
+нагрузить сервер профилированием. Лимит общий для воркеров только при
+общем кэше: LocMemCache у каждого процесса свой (см. check --deploy).
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+
+PARAM = '__profile'
+COOKIE = '__profile'
+SALT = 'core.profiling'
+NAME = re.compile(r'^[\w.-]+\.(prof|txt)$')
+
+
+def make_token(user):
+    return signing.dumps(user.pk, salt=SALT, compress=True)
+
+
+def token_user(token):
+    """id сотрудника из метки или None для чужой и просроченной."""
+    try:
+        return signing.loads(
+            token, salt=SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+
+
+def requested(request):
+    """Метка действительна и ее владелец все еще сотрудник.
+
+    Middleware стоит до AuthenticationMiddleware, поэтому права
+    проверяются по id из метки, а не по request.user.
+    """
+    token = request.GET.get(PARAM) or request.COOKIES.get(COOKIE)
+    pk = token_user(token) if token else None
+    return pk is not None and get_user_model().objects.filter(
+        pk=pk, is_active=True, is_staff=True
+    ).exists()
+
+
+def allowed():
+    """Выборка и общий для воркеров лимит профилей через кэш."""
+    if random.random() >= settings.PROFILE_SAMPLE_RATE:
+        return False
+    window = settings.PROFILE_RATE_WINDOW
+    key = f'profiling:{int(time.time() // window)}'
+    cache.add(key, 0, window * 2)
+    try:
+        return cache.incr(key) <= settings.PROFILE_RATE_LIMIT
+    except ValueError:
+        return False
+
+
+def capture(request, get_response):
+    """Выполняет запрос под cProfile и сохраняет профиль."""
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+    duration = time.perf_counter() - started
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name.replace(':', '.') if match else 'unresolved'
+    # Имена упорядочены по времени: так их сортируют saved() и cleanup()
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    name = f'{stamp}-{view}-{uuid.uuid4().hex[:8]}'
+    summary = (
+        f'{request.method} {request.get_full_path()} -> '
+        f'{response.status_code} за {duration * 1000:.1f} мс'
+    )
+    save(profiler, name, summary)
+    response['X-Profile'] = f'{name}.prof'
+    return response
+
+
+def save(profiler, name, summary):
+    os.makedirs(settings.PROFILE_ROOT, exist_ok=True)
+    base = os.path.join(settings.PROFILE_ROOT, name)
+    profiler.dump_stats(f'{base}.prof')
+    report = io.StringIO()
+    report.write(summary + '\n')
+    pstats.Stats(profiler, stream=report).sort_stats(
+        'cumulative'
+    ).print_stats(settings.PROFILE_TOP)
+    with open(f'{base}.txt', 'w', encoding='utf-8') as stream:
+        stream.write(report.getvalue())
+    cleanup()
+
+
+def cleanup():
+    """Оставляет только PROFILE_KEEP последних профилей."""
+    for entry in saved()[settings.PROFILE_KEEP:]:
+        for extension in ('prof', 'txt'):
+            try:
+                os.remove(os.path.join(
+                    settings.PROFILE_ROOT, f'{entry["name"]}.{extension}'
+                ))
+            except FileNotFoundError:
+                pass
+
+
+def saved():
+    """Сохраненные профили, новые первыми, с первой строкой отчета."""
+    try:
+        files = os.listdir(settings.PROFILE_ROOT)
+    except FileNotFoundError:
+        return []
+    entries = []
+    for file_name in sorted(files, reverse=True):
+        if not file_name.endswith('.txt'):
+            continue
+        path = os.path.join(settings.PROFILE_ROOT, file_name)
+        try:
+            with open(path, encoding='utf-8') as stream:
+                summary = stream.readline().strip()
+        except FileNotFoundError:
+            continue
+        entries.append({'name': file_name[:-4], 'summary': summary})
+    return entries
+
+
+def file_path(file_name):
+    """Путь к файлу профиля или None для чужого имени."""
+    if not NAME.match(file_name):
+        return None
+    full_path = os.path.join(settings.PROFILE_ROOT, file_name)
+    return full_path if os.path.isfile(full_path) else None
@@ -0,0 +1,214 @@
+"""Журнал SQL-запросов view с отпечатками и планами медленных.
+
+Каждый запрос сводится к отпечатку: литералы и параметры заменяются на
+?, списки значений сворачиваются. По паре (отпечаток, view) копятся
+число, суммарное и наибольшее время. Для запроса дольше порога
+сохраняются EXPLAIN QUERY PLAN, строка кода и строка шаблона, откуда он
+выполнен; хранится самый медленный образец на каждую пару.
+
+Процесс копит данные в памяти и раз в flush_interval секунд добавляет
+их в файл SQLite, общий для всех воркеров. Его читает slowqueries.
+"""
+import atexit
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.template.base import Node
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS queries ('
+    ' fingerprint TEXT NOT NULL,'
+    ' view TEXT NOT NULL,'
+    ' count INTEGER NOT NULL,'
+    ' total REAL NOT NULL,'
+    ' max REAL NOT NULL,'
+    ' slow INTEGER NOT NULL,'
+    ' PRIMARY KEY (fingerprint, view)'
+    ') WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS samples ('
+    ' fingerprint TEXT NOT NULL,'
+    ' view TEXT NOT NULL,'
+    ' duration REAL NOT NULL,'
+    ' sql TEXT NOT NULL,'
+    ' params TEXT NOT NULL,'
+    ' plan TEXT NOT NULL,'
+    ' location TEXT NOT NULL,'
+    ' template TEXT NOT NULL,'
+    ' captured REAL NOT NULL,'
+    ' PRIMARY KEY (fingerprint, view)'
+    ') WITHOUT ROWID',
+)
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?(?:e[-+]?\d+)?\b', re.I)
+PLACEHOLDER = re.compile(r'%s|\?')
+VALUES = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+ROWS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+SPACE = re.compile(r'\s+')
+MAX_PARAMS_LENGTH = 1000
+# Обертки самого проекта, через которые проходит любой запрос
+SKIP_MODULES = {
+    'core.querylog', 'core.metrics', 'core.middleware', 'core.nplusone',
+}
+RENDER_CODE = Node.render_annotated.__code__
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """SQL без литералов: одинаковые запросы с разными данными совпадают."""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = PLACEHOLDER.sub('?', sql)
+    sql = VALUES.sub('(...)', sql)
+    sql = ROWS.sub('(...)', sql)
+    return SPACE.sub(' ', sql).strip()
+
+
+def explain(connection, sql, params):
+    """План запроса отдельным курсором, мимо execute_wrapper.
+
+    Курсор драйвера не переводит ошибки в исключения Django, поэтому
+    ловится Database.Error самого драйвера.
+    """
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(
+            f'{connection.ops.explain_query_prefix()} {sql}', params
+        )
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except connection.Database.Error as error:
+        return f'EXPLAIN не удался: {error}'
+    finally:
+        cursor.close()
+
+
+def callers():
+    """Строка кода проекта и строка шаблона, откуда выполнен запрос."""
+    location = template = ''
+    frame = sys._getframe(2)
+    while frame and not (location and template):
+        code = frame.f_code
+        if not template and code is RENDER_CODE:
+            node = frame.f_locals['self']
+            # У шаблона из строки нет имени, только '<unknown source>'
+            name = node.origin.template_name or node.origin.name
+            template = f'{name}:{node.token.lineno}'
+        elif (
+            not location
+            and code.co_filename.startswith(settings.BASE_DIR)
+            and frame.f_globals.get('__name__') not in SKIP_MODULES
+        ):
+            path = os.path.relpath(code.co_filename, settings.BASE_DIR)
+            location = f'{path}:{frame.f_lineno} в {code.co_name}'
+        frame = frame.f_back
+    return location, template
+
+
+class QueryLog:
+    def __init__(self, path, threshold, flush_interval):
+        self.path = path
+        self.threshold = threshold
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.samples = {}
+        self.flushed = time.monotonic()
+        atexit.register(self.flush)
+
+    def add(self, sql, duration, view, sample=None):
+        key = (fingerprint(sql), view)
+        with self.lock:
+            count, total, longest, slow = self.totals.get(key, (0, 0, 0, 0))
+            self.totals[key] = (
+                count + 1,
+                total + duration,
+                max(longest, duration),
+                slow + (sample is not None),
+            )
+            if sample is not None and duration > self.samples.get(
+                key, (0,)
+            )[0]:
+                self.samples[key] = (duration, *sample)
+
+    def wrapper(self, request):
+        """execute_wrapper, который пишет запросы этого HTTP-запроса."""
+
+        def log_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - started
+                match = getattr(request, 'resolver_match', None)
+                view = match.view_name if match else '-'
+                sample = None
+                if duration >= self.threshold:
+                    sample = (
+                        sql,
+                        repr(params)[:MAX_PARAMS_LENGTH],
+                        '' if many else explain(
+                            context['connection'], sql, params
+                        ),
+                        *callers(),
+                    )
+                self.add(sql, duration, view, sample)
+
+        return log_query
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            totals, self.totals = self.totals, {}
+            samples, self.samples = self.samples, {}
+            self.flushed = time.monotonic()
+        if not totals:
+            return
+        db = connect(self.path)
+        try:
+            self.write(db, totals, samples)
+        finally:
+            db.close()
+
+    @staticmethod
+    def write(db, totals, samples):
+        with db:
+            db.executemany(
+                'INSERT INTO queries VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (fingerprint, view) DO UPDATE SET'
+                ' count = count + excluded.count,'
+                ' total = total + excluded.total,'
+                ' max = MAX(max, excluded.max),'
+                ' slow = slow + excluded.slow',
+                [(*key, *value) for key, value in totals.items()],
+            )
+            now = time.time()
+            db.executemany(
+                'INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (fingerprint, view) DO UPDATE SET'
+                ' duration = excluded.duration, sql = excluded.sql,'
+                ' params = excluded.params, plan = excluded.plan,'
+                ' location = excluded.location,'
+                ' template = excluded.template,'
+                ' captured = excluded.captured '
+                'WHERE excluded.duration > samples.duration',
+                [
+                    (*key, *value, now)
+                    for key, value in samples.items()
+                ],
+            )
+
+
+def connect(path):
+    """Соединение с файлом журнала, таблицы создаются при первом обращении."""
+    db = sqlite3.connect(path, timeout=30)
+    for statement in SCHEMA:
+        db.execute(statement)
+    return db
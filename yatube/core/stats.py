@@ -0,0 +1,97 @@
+"""Гистограммы задержек с логарифмически-линейными корзинами.
+
+Устроены как HdrHistogram: значения в микросекундах, до 2 ** SUB_BITS
+каждая корзина шириной 1 мкс, дальше на каждую степень двойки
+приходится 2 ** (SUB_BITS - 1) корзин. Относительная погрешность любого
+значения меньше 2 ** (1 - SUB_BITS), то есть меньше 1,6% при SUB_BITS = 7,
+а память не зависит от числа записей. Гистограммы разных потоков и
+процессов складываются без потери точности.
+"""
+SUB_BITS = 7
+HALF = 1 << (SUB_BITS - 1)
+# Хвост распределения важнее середины: под конец шаг мельче
+PERCENTILES = (50, 75, 90, 95, 99, 99.9, 99.99, 100)
+
+
+def bucket_index(value):
+    if value < 1 << SUB_BITS:
+        return value
+    shift = value.bit_length() - SUB_BITS
+    return shift * HALF + (value >> shift)
+
+
+def bucket_bounds(index):
+    """Наименьшее и наибольшее значения, попадающие в корзину."""
+    if index < 1 << SUB_BITS:
+        return index, index
+    shift = index // HALF - 1
+    top = index - shift * HALF
+    return top << shift, ((top + 1) << shift) - 1
+
+
+class Histogram:
+    """Распределение длительностей; record() принимает секунды."""
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, seconds):
+        value = max(int(seconds * 1e6), 0)
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = (
+                other.min if self.min is None else min(self.min, other.min)
+            )
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.total / 1e6 if self.total else 0
+
+    def percentile(self, percent):
+        """Значение в секундах, не больше которого percent% записей.
+
+        Как и HdrHistogram, возвращает верхнюю границу корзины, но не
+        больше наибольшего записанного значения.
+        """
+        if not self.total:
+            return 0
+        rank = max(1, -(-self.total * percent // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_bounds(index)[1], self.max) / 1e6
+        return self.max / 1e6
+
+    def summary(self):
+        """Процентили из PERCENTILES в секундах."""
+        return {
+            percent: self.percentile(percent) for percent in PERCENTILES
+        }
+
+    def to_dict(self):
+        return {
+            'counts': {str(index): count
+                       for index, count in sorted(self.counts.items())},
+            'total': self.total,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+        }
@@ -0,0 +1,163 @@
+"""Профиль рендеринга шаблонов: время по шаблонам, тегам и фильтрам.
+
+install() оборачивает Template._render и Node.render_annotated. Пока в
+потоке нет активного профиля, обертки только передают вызов дальше.
+Для каждого шаблона, тега (include, url, thumbnail, cache, for...) и
+переменной с фильтрами профиль считает число вызовов, полное время и
+собственное время без вложенных шаблонов и тегов. Профиль одного запроса
+попадает в Server-Timing, а сумма по всем запросам — в /metrics.
+Рекурсивный include учитывает полное время вложенного вызова дважды.
+"""
+import threading
+import time
+
+from django.template.base import Node, Template, TokenType
+
+from .metrics import PREFIX, escape
+
+_local = threading.local()
+_lock = threading.Lock()
+totals = {}
+
+
+class Profile:
+    def __init__(self):
+        self.entries = {}
+        # Время вложенных вызовов для каждого открытого вызова
+        self.children = []
+
+    def measure(self, key, function, *args):
+        self.children.append(0.0)
+        started = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            inclusive = time.perf_counter() - started
+            exclusive = inclusive - self.children.pop()
+            if self.children:
+                self.children[-1] += inclusive
+            calls, total, own = self.entries.get(key, (0, 0, 0))
+            self.entries[key] = (
+                calls + 1, total + inclusive, own + exclusive
+            )
+
+    def top(self, count):
+        """(ключ, вызовы, полное, собственное время) самых долгих."""
+        return sorted(
+            ((key, *entry) for key, entry in self.entries.items()),
+            key=lambda item: item[3],
+            reverse=True,
+        )[:count]
+
+    def server_timing(self, count):
+        return ', '.join(
+            f'tpl{number};dur={own * 1000:.2f};'
+            f'desc="{kind} {name} x{calls} incl {total * 1000:.2f}ms"'
+            for number, ((kind, name), calls, total, own) in enumerate(
+                self.top(count), 1
+            )
+        )
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+def start():
+    _local.profile = Profile()
+    return _local.profile
+
+
+def finish(profile):
+    _local.profile = None
+    with _lock:
+        for key, (calls, total, own) in profile.entries.items():
+            before = totals.get(key, (0, 0, 0))
+            totals[key] = (
+                before[0] + calls, before[1] + total, before[2] + own
+            )
+
+
+def reset():
+    with _lock:
+        totals.clear()
+
+
+def node_key(node):
+    """Ключ тега или переменной с фильтрами; None для остальных узлов."""
+    token = getattr(node, 'token', None)
+    if token is None:
+        return None
+    if token.token_type == TokenType.BLOCK:
+        name = token.contents.split(None, 1)[0]
+        if name in ('include', 'extends'):
+            return name, token.contents.split(None, 1)[1].strip('\'"')
+        return 'tag', name
+    filters = getattr(getattr(node, 'filter_expression', None), 'filters', ())
+    if token.token_type == TokenType.VAR and filters:
+        return 'filter', '|'.join(
+            f'{function.__module__.rsplit(".", 1)[-1]}.{function.__name__}'
+            for function, _ in filters
+        )
+    return None
+
+
+def install():
+    """Оборачивает рендеринг шаблонов и узлов, если еще не обернут.
+
+    Тестовое окружение Django само подменяет Template._render и после
+    тестов возвращает прежний, поэтому обертки ставятся по отдельности.
+    """
+    if not getattr(Template._render, 'profiled', False):
+        Template._render = profiled_template(Template._render)
+    if not getattr(Node.render_annotated, 'profiled', False):
+        Node.render_annotated = profiled_node(Node.render_annotated)
+
+
+def profiled_template(render):
+    def _render(self, context):
+        profile = current()
+        if profile is None:
+            return render(self, context)
+        name = self.origin.template_name or self.origin.name
+        return profile.measure(('template', name), render, self, context)
+
+    _render.profiled = True
+    return _render
+
+
+def profiled_node(render):
+    def render_annotated(self, context):
+        profile = current()
+        if profile is None:
+            return render(self, context)
+        # Узлы скомпилированных шаблонов переиспользуются, ключ тоже
+        key = self.__dict__.get('profile_key', False)
+        if key is False:
+            key = self.profile_key = node_key(self)
+        if key is None:
+            return render(self, context)
+        return profile.measure(key, render, self, context)
+
+    render_annotated.profiled = True
+    return render_annotated
+
+
+def exposition():
+    """Суммарное время по шаблонам, тегам и фильтрам для /metrics."""
+    with _lock:
+        items = sorted(totals.items())
+    lines = []
+    for metric, help_text, index in (
+        ('template_render_calls_total', 'Число вызовов.', 0),
+        ('template_render_seconds_total', 'Полное время.', 1),
+        ('template_render_self_seconds_total', 'Собственное время.', 2),
+    ):
+        lines.append(f'# HELP {PREFIX}_{metric} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{metric} counter')
+        for (kind, name), entry in items:
+            lines.append(
+                f'{PREFIX}_{metric}{{kind="{kind}",name="{escape(name)}"}} '
+                f'{round(entry[index], 6)}'
+            )
+    return '\n'.join(lines) + '\n' if items else ''
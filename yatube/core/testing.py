@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+# Страница ленты — ITEMS_COUNT постов, запрос на каждый пост превысит порог
+TEST_NPLUSONE_THRESHOLD = 5
+
+
+class TestRunner(DiscoverRunner):
+    """Тесты падают на N+1 в любом view, которое они запрашивают.
+
+    Миниатюры создаются в процессе теста: воркеры пула открыли бы
+    настоящую базу вместо тестовой.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        if settings.NPLUSONE_THRESHOLD is None:
+            settings.NPLUSONE_THRESHOLD = TEST_NPLUSONE_THRESHOLD
+        settings.NPLUSONE_RAISE = True
+        settings.THUMBNAIL_WORKERS = 0
@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from ..cache_backends import SQLiteCache
+
+INCREMENTS = 200
+
+
+def make_cache(path, **options):
+    return SQLiteCache(path, {'OPTIONS': options})
+
+
+def increment(path):
+    cache = make_cache(path)
+    for _ in range(INCREMENTS):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = make_cache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_values_round_trip(self):
+        values = {
+            'int': 5,
+            'big': 2 ** 70,
+            'bool': True,
+            'str': 'строка',
+            'dict': {'a': [1, 2]},
+            'none': None,
+        }
+        self.cache.set_many(values)
+        for key, value in values.items():
+            with self.subTest(key=key):
+                stored = self.cache.get(key, default='missing')
+                self.assertEqual(stored, value)
+                self.assertIs(type(stored), type(value))
+        self.assertEqual(
+            self.cache.get_many(['int', 'str', 'absent']),
+            {'int': 5, 'str': 'строка'},
+        )
+
+    def test_shared_between_instances(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(make_cache(self.path).get('key'), 'value')
+
+    def test_expired_entries_are_missing(self):
+        self.cache.set('key', 'value', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('absent')
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('spawn')
+        workers = [
+            context.Process(target=increment, args=(self.path,))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 4 * INCREMENTS)
+
+    def test_least_recently_used_are_evicted(self):
+        cache = make_cache(
+            self.path,
+            MAX_ENTRIES=10,
+            CULL_FREQUENCY=0,
+            CULL_EVERY=1,
+            TOUCH_INTERVAL=0,
+        )
+        for number in range(10):
+            cache.set(f'key{number}', number)
+            time.sleep(0.001)
+        cache.get('key0')
+        cache.set('key10', 10)
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(len(cache.get_many(
+            [f'key{number}' for number in range(11)]
+        )), 10)
+
+    def test_delete_and_clear(self):
+        self.cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.cache.delete('a')
+        self.assertEqual(self.cache.get_many(['a', 'b']), {'b': 2})
+        self.cache.clear()
+        self.assertEqual(self.cache.get_many(['b', 'c']), {})
@@ -0,0 +1,86 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics
+
+User = get_user_model()
+
+
+def server_timing(response):
+    return dict(
+        re.match(r'\s*(\w+)(.*)', part).groups()
+        for part in response['Server-Timing'].split(',')
+    )
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_server_timing(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:index'))
+        timing = server_timing(response)
+        self.assertEqual(set(timing), {'total', 'sql', 'template', 'cache'})
+        queries = int(re.search(r'"(\d+) queries"', timing['sql']).group(1))
+        self.assertGreater(queries, 0)
+        self.assertGreater(metrics.views['posts:index'].template.max, 0)
+        self.assertEqual(metrics.views['posts:index'].queries, queries)
+
+    def test_page_cache_hits_are_counted_under_view_name(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertIn('0 queries', response['Server-Timing'])
+        view = metrics.views['posts:index']
+        self.assertEqual(view.duration.total, 2)
+        self.assertGreater(view.hits, 0)
+        self.assertGreater(view.misses, 0)
+
+    def test_endpoint_is_staff_only(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_endpoint_exposition(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get('/no-such-page/')
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn(
+            '# TYPE yatube_request_duration_seconds summary', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            text,
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="unresolved"} 1',
+            text,
+        )
+        self.assertRegex(
+            text,
+            r'yatube_request_sql_seconds\{view="posts:index",'
+            r'quantile="0.99"\} \d+\.\d+',
+        )
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(metrics.views, {})
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.test.runner import DiscoverRunner
+
+from ..middleware import NPlusOneMiddleware
+from ..nplusone import NPlusOneError
+from ..testing import TEST_NPLUSONE_THRESHOLD, TestRunner
+
+LOOP = engines['django'].from_string(
+    '{% for permission in permissions %}'
+    '{{ permission.content_type.app_label }}'
+    '{% endfor %}'
+)
+
+
+def lazy_relations(count):
+    def view(request):
+        permissions = Permission.objects.order_by('pk')[:count]
+        return HttpResponse(LOOP.render({'permissions': permissions}))
+    return view
+
+
+def eager_relations(request):
+    permissions = Permission.objects.select_related('content_type')
+    return HttpResponse(LOOP.render({'permissions': permissions[:20]}))
+
+
+@override_settings(NPLUSONE_THRESHOLD=5, NPLUSONE_RAISE=True)
+class NPlusOneTest(TestCase):
+    def call(self, view):
+        return NPlusOneMiddleware(view)(RequestFactory().get('/'))
+
+    def test_lazy_relation_in_template_loop(self):
+        with self.assertRaisesMessage(NPlusOneError, '6 раз: SELECT'):
+            self.call(lazy_relations(6))
+
+    def test_report_points_to_template_and_code(self):
+        with self.assertRaises(NPlusOneError) as raised:
+            self.call(lazy_relations(10))
+        message = str(raised.exception)
+        self.assertIn('"django_content_type"', message)
+        self.assertIn('шаблон: <unknown source>:1', message)
+        self.assertIn('код: core/tests/test_nplusone.py', message)
+
+    def test_below_threshold_and_eager_loading_pass(self):
+        self.assertEqual(self.call(lazy_relations(5)).status_code, 200)
+        self.assertEqual(self.call(eager_relations).status_code, 200)
+
+    @override_settings(NPLUSONE_RAISE=False)
+    def test_logs_without_raise(self):
+        with self.assertLogs('core.nplusone', 'WARNING') as logs:
+            response = self.call(lazy_relations(6))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('N+1 в /', logs.output[0])
+
+
+# Окружение тестов уже настроено, второй раз Django его не настроит
+@mock.patch.object(DiscoverRunner, 'setup_test_environment')
+class TestRunnerTest(SimpleTestCase):
+    @override_settings(NPLUSONE_THRESHOLD=None, NPLUSONE_RAISE=False)
+    def test_enables_detector(self, setup):
+        TestRunner().setup_test_environment()
+        setup.assert_called_once()
+        self.assertEqual(settings.NPLUSONE_THRESHOLD, TEST_NPLUSONE_THRESHOLD)
+        self.assertTrue(settings.NPLUSONE_RAISE)
+        self.assertEqual(settings.THUMBNAIL_WORKERS, 0)
+
+    @override_settings(NPLUSONE_THRESHOLD=20, NPLUSONE_RAISE=False)
+    def test_keeps_configured_threshold(self, setup):
+        TestRunner().setup_test_environment()
+        self.assertEqual(settings.NPLUSONE_THRESHOLD, 20)
+        self.assertTrue(settings.NPLUSONE_RAISE)
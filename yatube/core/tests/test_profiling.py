@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import profiling
+from ..checks import check_shared_cache
+
+User = get_user_model()
+
+
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+
+    def setUp(self):
+        cache.clear()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings = override_settings(PROFILE_ROOT=self.root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.token = profiling.make_token(self.staff)
+
+    def profiled(self, token=None):
+        response = self.client.get(
+            reverse('posts:index'), {profiling.PARAM: token or self.token}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Profile')
+
+    def test_signed_flag_saves_profile_and_report(self):
+        name = self.profiled()
+        self.assertTrue(name.endswith('.prof'))
+        self.assertIn('posts.index', name)
+        self.assertTrue(os.path.isfile(os.path.join(self.root, name)))
+        self.client.force_login(self.staff)
+        page = self.client.get(reverse('profiles'))
+        self.assertContains(page, 'GET /?__profile=')
+        self.assertContains(page, self.token[:20])
+        report = self.client.get(
+            reverse('profile_file', args=[name.replace('.prof', '.txt')])
+        )
+        text = b''.join(report.streaming_content).decode()
+        self.assertIn('cumulative', text)
+        self.assertIn('views.py', text)
+        download = self.client.get(reverse('profile_file', args=[name]))
+        self.assertIn('attachment', download['Content-Disposition'])
+
+    def test_bad_or_expired_token_is_ignored(self):
+        self.assertIsNone(self.profiled(token='staff:forged'))
+        with override_settings(PROFILE_TOKEN_MAX_AGE=-1):
+            self.assertIsNone(self.profiled())
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_token_of_former_staff_is_ignored(self):
+        self.assertIsNone(self.profiled(profiling.make_token(self.user)))
+        User.objects.filter(pk=self.staff.pk).update(is_staff=False)
+        self.assertIsNone(self.profiled())
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_shared_cache_check(self):
+        self.assertEqual(
+            [error.id for error in check_shared_cache(None)], ['core.W001']
+        )
+        shared = {'default': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': os.path.join(self.root, 'cache.sqlite3'),
+        }}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(PROFILE_RATE_LIMIT=2)
+    def test_rate_limit(self):
+        names = [self.profiled() for _ in range(4)]
+        self.assertEqual(sum(name is not None for name in names), 2)
+
+    @override_settings(PROFILE_SAMPLE_RATE=0)
+    def test_sampling(self):
+        self.assertIsNone(self.profiled())
+
+    @override_settings(PROFILE_KEEP=2)
+    def test_old_profiles_are_removed(self):
+        first, *last = [self.profiled() for _ in range(3)]
+        self.assertEqual(
+            sorted(os.listdir(self.root)),
+            sorted(
+                name.replace('.prof', extension)
+                for name in last
+                for extension in ('.prof', '.txt')
+            ),
+        )
+
+    def test_cookie(self):
+        self.client.force_login(self.staff)
+        self.client.post(reverse('profiles_cookie'), {'enable': '1'})
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('X-Profile', response)
+        self.client.post(reverse('profiles_cookie'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('X-Profile', response)
+
+    def test_staff_only(self):
+        self.profiled()
+        name = profiling.saved()[0]['name'] + '.txt'
+        urls = (reverse('profiles'), reverse('profile_file', args=[name]))
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.user)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('profile_file', args=['..secret.txt'])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(profiling.file_path('../settings.py'))
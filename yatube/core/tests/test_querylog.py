@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from ..querylog import QueryLog, connect, explain, fingerprint
+
+User = get_user_model()
+
+
+class FingerprintTest(SimpleTestCase):
+    def test_literals_and_lists_are_stripped(self):
+        self.assertEqual(
+            fingerprint(
+                'SELECT "t"."id" FROM "posts_post" "t" '
+                "WHERE \"t\".\"text\" = 'it''s'  AND \"t\".\"id\" IN "
+                '(%s, %s, %s) AND "t"."author_id" > -1.5e3\n LIMIT 10'
+            ),
+            'SELECT "t"."id" FROM "posts_post" "t" WHERE "t"."text" = ? '
+            'AND "t"."id" IN (...) AND "t"."author_id" > ? LIMIT ?',
+        )
+
+    def test_same_query_with_other_data_matches(self):
+        self.assertEqual(
+            fingerprint('INSERT INTO "x" ("a", "b") VALUES (%s, %s)'),
+            fingerprint(
+                'INSERT INTO "x" ("a", "b") VALUES (%s, %s), (%s, %s)'
+            ),
+        )
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM "posts_post2" WHERE "id" = 5'),
+            'SELECT ? FROM "posts_post2" WHERE "id" = ?',
+        )
+
+
+class ExplainTest(TestCase):
+    def test_failing_query_keeps_its_own_error(self):
+        self.assertIn(
+            'EXPLAIN не удался',
+            explain(connection, 'SELECT * FROM missing_table', None),
+        )
+        log = QueryLog(':memory:', threshold=0, flush_interval=3600)
+        wrapper = log.wrapper(RequestFactory().get('/'))
+        with self.assertRaises(OperationalError):
+            with connection.execute_wrapper(wrapper):
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT * FROM missing_table')
+        [(duration, sql, params, plan, *_)] = log.samples.values()
+        self.assertIn('EXPLAIN не удался', plan)
+
+
+class SlowQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'queries.sqlite3')
+        settings = override_settings(
+            SLOW_QUERY_LOG=self.path,
+            SLOW_QUERY_THRESHOLD=0,
+            SLOW_QUERY_FLUSH_INTERVAL=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def slowqueries(self, **options):
+        out = StringIO()
+        call_command('slowqueries', stdout=out, **options)
+        return out.getvalue()
+
+    def test_queries_are_logged_with_plan_and_callers(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            # Иначе второй раз лента отдается из кэша без запроса постов
+            cache.clear()
+            self.client.get(reverse('posts:index'))
+        db = connect(self.path)
+        try:
+            counts = dict(db.execute(
+                'SELECT fingerprint, count FROM queries '
+                "WHERE view = 'posts:index'"
+            ))
+            samples = db.execute(
+                'SELECT plan, location, template FROM samples '
+                "WHERE view = 'posts:index'"
+            ).fetchall()
+        finally:
+            db.close()
+        self.assertTrue(counts)
+        self.assertTrue(all(count % 2 == 0 for count in counts.values()))
+        self.assertEqual(len(samples), len(counts))
+        plans, locations, templates = zip(*samples)
+        self.assertTrue(any(
+            'SEARCH' in plan or 'SCAN' in plan for plan in plans
+        ))
+        self.assertIn('posts/views.py', ' '.join(locations))
+        # Пользователь из сессии загружается, когда его спросит шаблон
+        self.assertIn('includes/header.html:', ' '.join(templates))
+
+    def test_report(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:profile', args=['author']))
+        report = self.slowqueries(view='posts:profile', order='max')
+        self.assertIn('1. posts:profile', report)
+        self.assertNotIn('posts:index', report)
+        self.assertIn('Самый медленный', report)
+        self.assertIn('posts:index', self.slowqueries(limit=100))
+        self.slowqueries(reset=True)
+        self.assertEqual(self.slowqueries(), '')
+
+    def test_missing_log(self):
+        with self.assertRaises(CommandError):
+            self.slowqueries()
@@ -0,0 +1,46 @@
+import random
+
+from django.test import SimpleTestCase
+
+from ..stats import SUB_BITS, Histogram, bucket_bounds, bucket_index
+
+
+class HistogramTest(SimpleTestCase):
+    def test_buckets_cover_values_with_bounded_error(self):
+        """Каждое значение лежит в своей корзине, ширина корзины мала."""
+        for value in list(range(1000)) + [2 ** 20 + 12345, 10 ** 9]:
+            with self.subTest(value=value):
+                low, high = bucket_bounds(bucket_index(value))
+                self.assertLessEqual(low, value)
+                self.assertLessEqual(value, high)
+                self.assertLess(high - low, max(1, value >> (SUB_BITS - 1)))
+
+    def test_percentiles_match_sorted_values(self):
+        rnd = random.Random(1)
+        values = [rnd.expovariate(20) for _ in range(5000)]
+        histogram = Histogram()
+        for value in values:
+            histogram.record(value)
+        ordered = sorted(values)
+        for percent in (50, 90, 99):
+            exact = ordered[len(ordered) * percent // 100 - 1]
+            self.assertAlmostEqual(
+                histogram.percentile(percent), exact, delta=exact * 0.02
+            )
+        self.assertAlmostEqual(histogram.percentile(100), max(values),
+                               delta=1e-6)
+        self.assertAlmostEqual(histogram.mean, sum(values) / len(values),
+                               delta=1e-5)
+
+    def test_merge_equals_single_histogram(self):
+        single, first, second = Histogram(), Histogram(), Histogram()
+        for number in range(1, 1001):
+            single.record(number / 1000)
+            (first if number % 2 else second).record(number / 1000)
+        merged = first.merge(second)
+        self.assertEqual(merged.to_dict(), single.to_dict())
+        self.assertEqual(merged.summary(), single.summary())
+
+    def test_empty(self):
+        self.assertEqual(Histogram().percentile(99), 0)
+        self.assertEqual(Histogram().mean, 0)
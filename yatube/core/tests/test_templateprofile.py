@@ -0,0 +1,92 @@
+import time
+
+from django import forms
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .. import templateprofile
+
+User = get_user_model()
+
+
+class NameForm(forms.Form):
+    name = forms.CharField()
+
+
+class ProfileTest(SimpleTestCase):
+    def test_exclusive_time_excludes_nested_calls(self):
+        profile = templateprofile.Profile()
+
+        def inner():
+            time.sleep(0.02)
+
+        def outer():
+            time.sleep(0.01)
+            profile.measure(('tag', 'inner'), inner)
+
+        profile.measure(('template', 'outer'), outer)
+        calls, total, own = profile.entries[('template', 'outer')]
+        self.assertEqual(calls, 1)
+        self.assertGreaterEqual(total, 0.03)
+        self.assertLess(own, 0.02)
+        self.assertGreaterEqual(profile.entries[('tag', 'inner')][2], 0.02)
+
+    def test_tags_includes_and_filters(self):
+        templateprofile.install()
+        template = engines['django'].from_string(
+            '{% load user_filters %}'
+            '{% for number in numbers %}{{ number|add:1 }}{% endfor %}'
+            '{{ form.name|addclass:"form-control" }}'
+            '{% include "includes/footer.html" %}'
+        )
+        profile = templateprofile.start()
+        try:
+            template.render({'numbers': [1, 2, 3], 'form': NameForm()})
+        finally:
+            templateprofile.finish(profile)
+            templateprofile.reset()
+        self.assertIn(('tag', 'for'), profile.entries)
+        self.assertEqual(profile.entries[('filter', 'defaultfilters.add')][0],
+                         3)
+        self.assertIn(('filter', 'user_filters.addclass'), profile.entries)
+        self.assertIn(('include', 'includes/footer.html'), profile.entries)
+        self.assertIn(('template', 'includes/footer.html'), profile.entries)
+
+
+class TemplateProfileMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        templateprofile.reset()
+        self.addCleanup(templateprofile.reset)
+
+    @override_settings(TEMPLATE_PROFILE_RATE=1, TEMPLATE_PROFILE_TOP=3)
+    def test_request_profile_and_totals(self):
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertIn('tpl3;', timing)
+        self.assertNotIn('tpl4;', timing)
+        self.assertIn(('template', 'posts/index.html'),
+                      templateprofile.totals)
+        self.assertIn(('include', 'includes/header.html'),
+                      templateprofile.totals)
+        self.client.force_login(self.staff)
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'yatube_template_render_calls_total'
+            '{kind="template",name="posts/index.html"} 1',
+            text,
+        )
+        self.assertIn('yatube_template_render_self_seconds_total', text)
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('tpl1;', response['Server-Timing'])
+        self.assertEqual(templateprofile.totals, {})
@@ -1,4 +1,11 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_POST
+
+from . import metrics as request_metrics
+from . import profiling, templateprofile
 
 
 def page_not_found(request, exception):
@@ -15,3 +22,54 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics(request):
+    return HttpResponse(
+        request_metrics.exposition() + templateprofile.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@staff_member_required
+def profiles(request):
+    context = {
+        'title': 'Профили запросов',
+        'profiles': profiling.saved(),
+        'param': profiling.PARAM,
+        'token': profiling.make_token(request.user),
+        'minutes': settings.PROFILE_TOKEN_MAX_AGE // 60,
+        'cookie_enabled': profiling.COOKIE in request.COOKIES,
+    }
+    return render(request, 'core/profiles.html', context)
+
+
+@staff_member_required
+@require_POST
+def profiles_cookie(request):
+    """Включает или выключает профилирование всех запросов браузера."""
+    response = redirect('profiles')
+    if request.POST.get('enable'):
+        response.set_cookie(
+            profiling.COOKIE,
+            profiling.make_token(request.user),
+            max_age=settings.PROFILE_TOKEN_MAX_AGE,
+            httponly=True,
+            samesite='Lax',
+        )
+    else:
+        response.delete_cookie(profiling.COOKIE)
+    return response
+
+
+@staff_member_required
+def profile_file(request, name):
+    path = profiling.file_path(name)
+    if path is None:
+        raise Http404
+    if name.endswith('.txt'):
+        return FileResponse(
+            open(path, 'rb'), content_type='text/plain; charset=utf-8'
+        )
+    return FileResponse(open(path, 'rb'), as_attachment=True)
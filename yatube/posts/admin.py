@@ -1,9 +1,55 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.utils.functional import cached_property
 
 from .models import Comment, Follow, Group, Post
+from .search import filter_posts, fts_query
 
 
-class PostAdmin(admin.ModelAdmin):
+class EstimatedCountPaginator(Paginator):
+    """Считает строки точно только до ADMIN_EXACT_COUNT_LIMIT.
+
+    COUNT(*) по большой таблице читает весь индекс. Дальше лимита
+    число строк без фильтров оценивается по наибольшему id, а с
+    фильтрами известно только, что их больше лимита: count на единицу
+    больше него, и lower_bound показывает в списке «больше N».
+    """
+    lower_bound = None
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        queryset = self.object_list
+        count = queryset[:limit + 1].count()
+        if count <= limit:
+            return count
+        if queryset.query.where:
+            self.lower_bound = limit
+            return count
+        estimate = queryset.model._base_manager.aggregate(last=Max('pk'))
+        return max(estimate['last'] or 0, count)
+
+
+class FastChangeListAdmin(admin.ModelAdmin):
+    """Список объектов за постоянное число запросов."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if formfield is not None and db_field.name in self.list_editable:
+            # Варианты читаются один раз на класс формы. Иначе каждая
+            # строка списка заново выполняет queryset своего select
+            formfield.choices = list(formfield.choices)
+        return formfield
+
+
+class PostAdmin(FastChangeListAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,9 +58,21 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    # Групп немного: select с общими вариантами дешевле автодополнения,
+    # которое в list_editable дочитывало бы выбранную группу на строку
+    autocomplete_fields = ('author',)
     search_fields = ('text',)
+    # Фильтр по дате не делает запросов, а date_hierarchy читает
+    # границы дат по индексу post_date_id_idx
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    date_hierarchy = 'pub_date'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по text идет через индекс FTS5 вместо LIKE '%...%'
+        if not fts_query(search_term):
+            return queryset, False
+        return filter_posts(queryset, search_term), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -26,7 +84,29 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class CommentAdmin(FastChangeListAdmin):
+    list_display = (
+        'pk',
+        'text',
+        'created',
+        'author',
+        'post',
+    )
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('post', 'author')
+
+
+class FollowAdmin(FastChangeListAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'author',
+    )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,72 @@
+from django.conf import settings
+
+from core.cache import add_cache_versions, get_versions, invalidate
+
+INDEX_FEED = 'feed:index'
+
+
+def group_feed(group_id):
+    return f'feed:group:{group_id}'
+
+
+def profile_feed(author_id):
+    return f'feed:profile:{author_id}'
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def author_tag(author_id):
+    return f'author:{author_id}'
+
+
+def group_tag(slug):
+    return f'group:{slug}'
+
+
+def feed_version(request, feed, *tags):
+    """Версия ленты; читать ее нужно до запроса постов страницы.
+
+    Иначе посты, прочитанные до коммита чужой транзакции, попадут в кэш
+    под версией, которую invalidate() сбросила уже после коммита. Заодно
+    страница помечается лентой и тегами tags для кэша страниц. Теги самих
+    постов ленте не нужны: post_changed() сбрасывает и ленты с постом.
+    """
+    versions = get_versions(feed, *tags)
+    add_cache_versions(request, versions)
+    return versions[feed]
+
+
+def feed_cache(feed, version, page_obj):
+    """Таймаут и ключ фрагмента ленты для тега {% cache %}."""
+    return {
+        'timeout': settings.FEED_CACHE_TTL,
+        'key': f'{feed}:{version}:{page_obj.paginator.page_key}',
+    }
+
+
+def post_changed(post, *group_ids):
+    """Сбрасывает ленты и страницы, на которых показывается пост."""
+    names = [
+        INDEX_FEED,
+        profile_feed(post.author_id),
+        post_tag(post.pk),
+        author_tag(post.author_id),
+    ]
+    names += [group_feed(pk) for pk in {post.group_id, *group_ids} if pk]
+    invalidate(*names)
+
+
+def comment_changed(comment):
+    invalidate(post_tag(comment.post_id))
+
+
+def follow_changed(follow):
+    invalidate(author_tag(follow.author_id), author_tag(follow.user_id))
+
+
+def group_changed(group):
+    # Лента группы сбрасывается и по pk: после смены slug
+    # страница по старому адресу не должна отдаваться из кэша.
+    invalidate(group_tag(group.slug), group_feed(group.pk))
@@ -0,0 +1,95 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import Profile
+
+from .models import Comment, Follow, Group, Post
+
+
+def change(queryset, field, delta):
+    """Атомарно сдвигает счетчик, не опуская его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def post_added(post):
+    change(Profile.objects.filter(user_id=post.author_id), 'posts_count', 1)
+    if post.group_id:
+        change(Group.objects.filter(pk=post.group_id), 'posts_count', 1)
+
+
+def post_removed(post):
+    change(Profile.objects.filter(user_id=post.author_id), 'posts_count', -1)
+    if post.group_id:
+        change(Group.objects.filter(pk=post.group_id), 'posts_count', -1)
+
+
+def post_regrouped(old_group_id, new_group_id):
+    if old_group_id:
+        change(Group.objects.filter(pk=old_group_id), 'posts_count', -1)
+    if new_group_id:
+        change(Group.objects.filter(pk=new_group_id), 'posts_count', 1)
+
+
+def comment_changed(comment, delta):
+    change(Post.objects.filter(pk=comment.post_id), 'comments_count', delta)
+
+
+def follow_changed(follow, delta):
+    change(
+        Profile.objects.filter(user_id=follow.author_id),
+        'followers_count',
+        delta,
+    )
+    change(
+        Profile.objects.filter(user_id=follow.user_id),
+        'following_count',
+        delta,
+    )
+
+
+def count_of(model, field):
+    """Подзапрос с числом строк model, ссылающихся на внешнюю строку."""
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+COUNTERS = (
+    (Profile, {
+        'posts_count': (Post, 'author'),
+        'followers_count': (Follow, 'author'),
+        'following_count': (Follow, 'user'),
+    }),
+    (Group, {
+        'posts_count': (Post, 'group'),
+    }),
+    (Post, {
+        'comments_count': (Comment, 'post'),
+    }),
+)
+
+
+def recount(model, counters, pk_from, pk_to):
+    """Пересчитывает счетчики строк model с pk в [pk_from, pk_to)."""
+    return model.objects.filter(pk__gte=pk_from, pk__lt=pk_to).update(**{
+        name: count_of(source, field)
+        for name, (source, field) in counters.items()
+    })
+
+
+def profile_of(user):
+    """Профиль пользователя; недостающий создается и пересчитывается.
+
+    Профиля нет у пользователей из loaddata, где сигнал не срабатывает,
+    и из прерванного импорта: там профили создает recount_counters.
+    """
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        pass
+    Profile.objects.get_or_create(user=user)
+    recount(Profile, dict(COUNTERS)[Profile], user.pk, user.pk + 1)
+    user.profile = Profile.objects.get(user=user)
+    return user.profile
@@ -0,0 +1,119 @@
+"""Синтетические данные для профилирования: generate_dataset.
+
+Строки генерируются пачками в пуле процессов. Каждая пачка получает
+свой генератор случайных чисел из (seed, таблица, номер пачки), поэтому
+при тех же seed и размере пачки результат не зависит от числа воркеров
+и порядка их завершения.
+Подписчики распределены по авторам по степенному закону: вес автора
+номер r равен (r + 1) ** -skew.
+"""
+import itertools
+import random
+from datetime import timedelta
+from functools import lru_cache
+
+from faker import Faker
+
+LOCALE = 'ru_RU'
+
+
+def chunk_random(seed, table, chunk):
+    generator = random.Random(f'{seed}:{table}:{chunk}')
+    fake = Faker(LOCALE)
+    fake.seed_instance(generator.getrandbits(64))
+    return generator, fake
+
+
+@lru_cache(maxsize=4)
+def author_weights(users, skew):
+    """Накопленные веса авторов для random.choices(cum_weights=...)."""
+    return list(itertools.accumulate(
+        (rank + 1) ** -skew for rank in range(users)
+    ))
+
+
+def users(seed, chunk, first_id, count):
+    generator, fake = chunk_random(seed, 'users', chunk)
+    return [
+        (pk, f'{fake.user_name()}{pk}', fake.first_name(), fake.last_name())
+        for pk in range(first_id, first_id + count)
+    ]
+
+
+def follows(seed, chunk, first_id, count, first_user_id, total_users,
+            mean, skew):
+    """Подписки пользователей с id из [first_id, first_id + count)."""
+    generator, _ = chunk_random(seed, 'follows', chunk)
+    weights = author_weights(total_users, skew)
+    ranks = range(total_users)
+    rows = []
+    for user_id in range(first_id, first_id + count):
+        wanted = min(
+            round(generator.expovariate(1 / mean)) if mean else 0,
+            total_users - 1,
+        )
+        authors = {
+            first_user_id + rank
+            for rank in generator.choices(ranks, cum_weights=weights,
+                                          k=wanted)
+        }
+        authors.discard(user_id)
+        rows.extend((user_id, author_id) for author_id in sorted(authors))
+    return rows
+
+
+def posts(seed, chunk, first_id, count, first_user_id, total_users,
+          group_ids, start, days):
+    generator, fake = chunk_random(seed, 'posts', chunk)
+    rows = []
+    for pk in range(first_id, first_id + count):
+        group_id = None
+        if group_ids and generator.random() < 0.5:
+            group_id = generator.choice(group_ids)
+        rows.append((
+            pk,
+            first_user_id + generator.randrange(total_users),
+            group_id,
+            fake.paragraph(nb_sentences=generator.randint(1, 8)),
+            start + timedelta(seconds=generator.uniform(0, days * 86400)),
+        ))
+    return rows
+
+
+def comments(seed, chunk, first_id, count, first_post_id, total_posts,
+             first_user_id, total_users, start, days):
+    generator, fake = chunk_random(seed, 'comments', chunk)
+    return [
+        (
+            pk,
+            first_post_id + generator.randrange(total_posts),
+            first_user_id + generator.randrange(total_users),
+            fake.sentence(nb_words=generator.randint(3, 20)),
+            start + timedelta(seconds=generator.uniform(0, days * 86400)),
+        )
+        for pk in range(first_id, first_id + count)
+    ]
+
+
+def chunks(total, size):
+    """Номера, первые смещения и размеры пачек."""
+    for chunk, offset in enumerate(range(0, total, size)):
+        yield chunk, offset, min(size, total - offset)
+
+
+def generate(executor, function, tasks, window):
+    """Результаты пачек по порядку; в работе не больше window пачек.
+
+    Пул считает следующие пачки, пока текущая сохраняется в базу, но
+    готовые строки не копятся в памяти без ограничения.
+    """
+    tasks = iter(tasks)
+    pending = [
+        executor.submit(function, *task)
+        for task in itertools.islice(tasks, window)
+    ]
+    while pending:
+        result = pending.pop(0).result()
+        for task in itertools.islice(tasks, 1):
+            pending.append(executor.submit(function, *task))
+        yield result
@@ -0,0 +1,105 @@
+import math
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from PIL import Image, ImageOps
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+# Режимы с прозрачностью сохраняются в PNG, остальные в JPEG
+ALPHA_MODES = ('RGBA', 'LA', 'PA')
+
+
+def check_limits(upload, image):
+    """Проверяет размер файла и число пикселей по заголовку картинки."""
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': settings.POST_IMAGE_MAX_BYTES // 2 ** 20},
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка больше %(limit)d мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+        )
+
+
+def target_size(size, max_side):
+    width, height = size
+    ratio = min(1, max_side / max(width, height))
+    return math.ceil(width * ratio), math.ceil(height * ratio)
+
+
+def normalize_image(upload):
+    """Уменьшенная копия загрузки без EXIF, повернутая по ориентации.
+
+    Полностью картинка не декодируется: JPEG читается в режиме draft
+    сразу с уменьшением в 2, 4 или 8 раз.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        check_limits(upload, image)
+        max_side = settings.POST_IMAGE_MAX_SIDE
+        if image.format == 'JPEG':
+            image.draft('RGB', target_size(image.size, max_side))
+        # Уменьшение на месте, поворот — уже маленькой копии
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        # Профиль CMYK не подходит к сохраняемой RGB-копии
+        icc_profile = image.mode != 'CMYK' and image.info.get('icc_profile')
+        normalized = ImageOps.exif_transpose(image)
+    if normalized.mode == 'P' and 'transparency' in normalized.info:
+        normalized = normalized.convert('RGBA')
+    if normalized.mode in ALPHA_MODES:
+        image_format, extension = 'PNG', '.png'
+        options = {'optimize': True}
+    else:
+        image_format, extension = 'JPEG', '.jpg'
+        normalized = normalized.convert('RGB')
+        options = {
+            'quality': settings.POST_IMAGE_JPEG_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    if icc_profile:
+        # Цветовой профиль нужен для правильных цветов, это не метаданные
+        options['icc_profile'] = icc_profile
+    output = BytesIO()
+    normalized.save(output, image_format, **options)
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    return SimpleUploadedFile(
+        name, output.getvalue(), content_type=Image.MIME[image_format]
+    )
+
+
+def release(name):
+    """После коммита удаляет файл, если на него больше нет ссылок."""
+    if name:
+        transaction.on_commit(lambda: delete_unused(name))
+
+
+def delete_unused(name):
+    storage = Post._meta.get_field('image').storage
+    if not storage.is_hashed(name) or Post.objects.filter(image=name).exists():
+        return
+    # Новый пост мог застать файл на месте и еще не закоммититься. Файл
+    # сперва убирается из-под имени: такой пост после коммита не найдет
+    # его и вернет (ContentAddressedStorage.restore), а успевший
+    # закоммититься найдется повторной проверкой
+    hidden = storage.hide(name)
+    if hidden is None:
+        return
+    if Post.objects.filter(image=name).exists():
+        storage.unhide(hidden, name)
+        return
+    # Миниатюры и записи sorl общие для всех постов с этим файлом
+    delete_thumbnails(ImageFile(name, storage), delete_file=False)
+    storage.delete(hidden)
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings as django_settings
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+
+class LRU:
+    """Потокобезопасный словарь с вытеснением давно не читанных ключей.
+
+    Запись живет не дольше ttl секунд: удаление миниатюры в другом
+    процессе до этого LRU не доходит.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key not in self._data:
+                    continue
+                value, expires = self._data[key]
+                if expires <= now:
+                    del self._data[key]
+                    continue
+                self._data.move_to_end(key)
+                found[key] = value
+        return found
+
+    def set_many(self, data):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._data.update(
+                (key, (value, expires)) for key, value in data.items()
+            )
+            for key in data:
+                self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Хранилище миниатюр sorl: LRU процесса, затем кэш, затем база.
+
+    Промахи не запоминаются: миниатюры создает пул процессов уже после
+    того, как лента отрисовалась с исходной картинкой, и запомненный
+    промах спрятал бы готовую миниатюру на THUMBNAIL_CACHE_TIMEOUT.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lru = LRU(
+            django_settings.THUMBNAIL_LRU_SIZE,
+            django_settings.THUMBNAIL_LRU_TTL,
+        )
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        self.lru.clear()
+
+    def _get_raw(self, key):
+        return self.get_many_raw([key]).get(key)
+
+    def get_many_raw(self, keys):
+        """Значения ключей одним обращением к кэшу и одним к базе."""
+        found = self.lru.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            cached = self.cache.get_many(missing)
+            found.update(cached)
+            missing = [key for key in missing if key not in cached]
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            self.cache.set_many(stored, settings.THUMBNAIL_CACHE_TIMEOUT)
+            found.update(stored)
+        # Записи прошлого cached_db: так он запоминал промахи
+        found = {
+            key: value for key, value in found.items()
+            if value != cached_db_kvstore.EMPTY_VALUE
+        }
+        self.lru.set_many(found)
+        return found
+
+    def get_many_images(self, image_files):
+        """Найденные в хранилище миниатюры по их ключам."""
+        keys = {
+            add_prefix(image_file.key, 'image'): image_file
+            for image_file in image_files
+        }
+        return {
+            keys[key].key: deserialize_image_file(value)
+            for key, value in self.get_many_raw(list(keys)).items()
+        }
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self.lru.set_many({key: value})
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        self.lru.delete_many(keys)
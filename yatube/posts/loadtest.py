@@ -0,0 +1,102 @@
+"""Сценарии для manage.py loadtest.
+
+Каждый виртуальный пользователь на каждом шаге выбирает сценарий по
+весам из options['mix'] и выполняет его целиком: анонимное чтение
+лент, чтение ленты подписок, комментарий или новый пост.
+"""
+import random
+import time
+
+from django.db.models import Count
+from django.urls import reverse
+
+from core.loadtest import Recorder, WSGIClient
+from yatube.wsgi import application
+
+from .models import Group, Post, User
+
+SCENARIOS = ('anonymous', 'reader', 'commenter', 'poster')
+SAMPLE_SIZE = 1000
+
+
+def sample(queryset, size=SAMPLE_SIZE):
+    """Случайные значения без ORDER BY RANDOM() по всей таблице."""
+    values = list(queryset[:size * 20])
+    return random.Random(0).sample(values, min(size, len(values)))
+
+
+def targets():
+    """Что будут запрашивать пользователи: id, имена и slug-и."""
+    return {
+        'posts': sample(Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        )),
+        'authors': sample(User.objects.filter(
+            posts__isnull=False
+        ).distinct().values_list('username', flat=True)),
+        'groups': list(Group.objects.values_list('slug', flat=True)),
+        'readers': sample(User.objects.annotate(
+            subscriptions=Count('follower')
+        ).order_by('-subscriptions').values_list('pk', flat=True)),
+    }
+
+
+class VirtualUser:
+    def __init__(self, number, options):
+        self.options = options
+        self.rnd = random.Random(f'{options["seed"]}:{number}')
+        self.recorder = Recorder()
+        self.anonymous = WSGIClient(application)
+        self.client = WSGIClient(application)
+        readers = options['targets']['readers']
+        if readers:
+            self.client.login(User.objects.get(
+                pk=readers[number % len(readers)]
+            ))
+
+    def pick(self, key):
+        return self.rnd.choice(self.options['targets'][key])
+
+    def get(self, client, name, *args, **params):
+        return self.recorder.call(client.get, reverse(name, args=args), params)
+
+    def post(self, client, name, data, *args):
+        return self.recorder.call(client.post, reverse(name, args=args), data)
+
+    def anonymous_scenario(self):
+        self.get(self.anonymous, 'posts:index', page=self.rnd.randint(1, 3))
+        self.get(self.anonymous, 'posts:post_detail', self.pick('posts'))
+        self.get(self.anonymous, 'posts:profile', self.pick('authors'))
+        if self.options['targets']['groups']:
+            self.get(self.anonymous, 'posts:group_posts', self.pick('groups'))
+
+    def reader_scenario(self):
+        self.get(self.client, 'posts:follow_index',
+                 page=self.rnd.randint(1, 3))
+        self.get(self.client, 'posts:post_detail', self.pick('posts'))
+
+    def commenter_scenario(self):
+        post_id = self.pick('posts')
+        # Страница поста с формой выдает cookie с токеном CSRF
+        self.get(self.client, 'posts:post_detail', post_id)
+        self.post(self.client, 'posts:add_comment',
+                  {'text': 'Комментарий под нагрузкой'}, post_id)
+
+    def poster_scenario(self):
+        self.get(self.client, 'posts:post_create')
+        self.post(self.client, 'posts:post_create',
+                  {'text': 'Пост под нагрузкой', 'group': ''})
+
+    def run(self, deadline):
+        scenarios, weights = zip(*self.options['mix'].items())
+        think_time = self.options['think_time']
+        while time.time() < deadline:
+            scenario = self.rnd.choices(scenarios, weights)[0]
+            getattr(self, f'{scenario}_scenario')()
+            if think_time:
+                time.sleep(self.rnd.expovariate(1 / think_time))
+        return self.recorder
+
+
+def virtual_user(number, deadline, options):
+    return VirtualUser(number, options).run(deadline)
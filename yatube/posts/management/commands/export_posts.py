@@ -0,0 +1,54 @@
+import os
+import shutil
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.transfer import Progress, dump, export_records
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Файл для выгрузки, "-" — стандартный вывод.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--images',
+            help='Каталог, куда скопировать картинки постов.',
+        )
+
+    def handle(self, *args, output, chunk_size, images, **options):
+        # Прогресс идет в stderr: stdout может быть самой выгрузкой
+        progress = Progress(self.stderr.write)
+        if output == '-':
+            self.export(sys.stdout, chunk_size, images, progress)
+        else:
+            with open(output, 'w', encoding='utf-8') as stream:
+                self.export(stream, chunk_size, images, progress)
+        self.stderr.write(f'Выгружено: {progress.summary()}')
+
+    def export(self, stream, chunk_size, images, progress):
+        storage = Post._meta.get_field('image').storage
+        for record in export_records(chunk_size):
+            stream.write(dump(record))
+            if images and record.get('image'):
+                self.copy_image(storage, record['image'], images)
+            progress.add(1)
+
+    def copy_image(self, storage, name, directory):
+        target = os.path.join(directory, name)
+        if os.path.exists(target):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with storage.open(name) as source, open(target, 'wb') as copy:
+            shutil.copyfileobj(source, copy)
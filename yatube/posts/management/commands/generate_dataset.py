@@ -0,0 +1,182 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from faker import Faker
+
+from posts import dataset, timeline
+from posts.models import Comment, Follow, Group, Post, User
+from posts.transfer import Progress, restore_dates
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками со степенным распределением подписчиков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--follows',
+            type=float,
+            default=20,
+            help='Среднее число подписок пользователя.',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель степенного закона для подписчиков авторов.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней распределить даты постов.',
+        )
+        parser.add_argument(
+            '--end',
+            type=parse_datetime,
+            help='Дата последнего поста в ISO 8601, по умолчанию сейчас. '
+                 'С ней повторный запуск с тем же seed дает те же даты.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько строк генерировать и сохранять за раз.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Сколько процессов генерируют строки.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        end = options['end'] or timezone.now()
+        self.start = end - timedelta(days=options['days'])
+        # spawn: воркерам не достаются соединения с базой родителя
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as self.executor:
+            first_user = self.next_id(User)
+            self.fill(User, self.save_users, dataset.users, (
+                (options['seed'], chunk, first_user + offset, count)
+                for chunk, offset, count in self.chunks(options['users'])
+            ))
+            group_ids = self.create_groups()
+            self.fill(Follow, self.save_follows, dataset.follows, (
+                (options['seed'], chunk, first_user + offset, count,
+                 first_user, options['users'], options['follows'],
+                 options['skew'])
+                for chunk, offset, count in self.chunks(options['users'])
+            ))
+            first_post = self.next_id(Post)
+            self.fill(Post, self.save_posts, dataset.posts, (
+                (options['seed'], chunk, first_post + offset, count,
+                 first_user, options['users'], group_ids, self.start,
+                 options['days'])
+                for chunk, offset, count in self.chunks(options['posts'])
+            ))
+            first_comment = self.next_id(Comment)
+            self.fill(Comment, self.save_comments, dataset.comments, (
+                (options['seed'], chunk, first_comment + offset, count,
+                 first_post, options['posts'], first_user, options['users'],
+                 self.start, options['days'])
+                for chunk, offset, count in self.chunks(
+                    options['comments'] if options['posts'] else 0
+                )
+            ))
+        call_command('recount_counters', stdout=self.stdout)
+        cache.clear()
+
+    def chunks(self, total):
+        return dataset.chunks(total, self.options['batch_size'])
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def fill(self, model, save, function, tasks):
+        progress = Progress(self.stderr.write)
+        for rows in dataset.generate(
+            self.executor, function, tasks, 2 * self.options['workers']
+        ):
+            with transaction.atomic():
+                save(rows)
+            progress.add(len(rows))
+        self.stdout.write(f'{model.__name__}: {progress.summary()}')
+
+    def save_users(self, rows):
+        # Вход синтетическим пользователям не нужен
+        password = make_password(None)
+        User.objects.bulk_create(
+            User(
+                pk=pk,
+                username=username,
+                first_name=first_name,
+                last_name=last_name,
+                password=password,
+                date_joined=self.start,
+            )
+            for pk, username, first_name, last_name in rows
+        )
+
+    def create_groups(self):
+        fake = Faker(dataset.LOCALE)
+        fake.seed_instance(self.options['seed'])
+        first_id = self.next_id(Group)
+        slugs = [
+            f'group-{pk}'
+            for pk in range(first_id, first_id + self.options['groups'])
+        ]
+        Group.objects.bulk_create(
+            Group(
+                slug=slug,
+                title=fake.sentence(nb_words=3).rstrip('.'),
+                description=fake.paragraph(),
+            )
+            for slug in slugs
+        )
+        self.stdout.write(f'Group: {len(slugs)}')
+        return list(Group.objects.filter(
+            slug__in=slugs
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def save_follows(self, rows):
+        Follow.objects.bulk_create(
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in rows
+        )
+
+    def save_posts(self, rows):
+        posts = Post.objects.bulk_create(
+            Post(pk=pk, author_id=author_id, group_id=group_id, text=text)
+            for pk, author_id, group_id, text, pub_date in rows
+        )
+        restore_dates(posts, 'pub_date', [row[4] for row in rows])
+        # Подписки уже созданы: посты раскладываются по лентам сразу
+        timeline.fan_out_posts([row[0] for row in rows])
+
+    def save_comments(self, rows):
+        comments = Comment.objects.bulk_create(
+            Comment(pk=pk, post_id=post_id, author_id=author_id, text=text)
+            for pk, post_id, author_id, text, created in rows
+        )
+        restore_dates(comments, 'created', [row[4] for row in rows])
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate, get_executor
+
+
+class Command(BaseCommand):
+    help = 'Создает миниатюры картинок всех постов из POST_THUMBNAILS.'
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct()
+        done = 0
+        for _ in get_executor().map(generate, names.iterator()):
+            done += 1
+        self.stdout.write(f'Обработано картинок: {done}')
@@ -0,0 +1,71 @@
+import json
+import sys
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from posts.transfer import Importer, Progress
+
+
+class Command(BaseCommand):
+    help = 'Загружает NDJSON из export_posts пачками через bulk_create.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            help='Файл выгрузки, "-" — стандартный ввод.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк сохранять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--images',
+            help='Каталог с картинками из export_posts --images.',
+        )
+
+    def handle(self, *args, input, batch_size, images, **options):
+        importer = Importer(images)
+        progress = Progress(self.stderr.write)
+        if input == '-':
+            self.load(sys.stdin, importer, batch_size, progress)
+        else:
+            with open(input, encoding='utf-8') as stream:
+                self.load(stream, importer, batch_size, progress)
+        self.stdout.write(f'Загружено: {progress.summary()}')
+        # Счетчики и кэш лент после загрузки в обход сигналов
+        call_command('recount_counters', stdout=self.stdout)
+        cache.clear()
+
+    def load(self, stream, importer, batch_size, progress):
+        model, batch = None, []
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                raise CommandError(f'Строка {number}: {error}')
+            if batch and (
+                record.get('model') != model or len(batch) >= batch_size
+            ):
+                self.save(importer, model, batch, number, progress)
+                batch = []
+            model = record.get('model')
+            batch.append(record)
+        if batch:
+            self.save(importer, model, batch, number, progress)
+
+    def save(self, importer, model, batch, number, progress):
+        try:
+            with transaction.atomic():
+                progress.add(importer.save(model, batch))
+        except (IntegrityError, KeyError, ValueError) as error:
+            raise CommandError(
+                f'Пачка {model} перед строкой {number}: '
+                f'{type(error).__name__}: {error}'
+            )
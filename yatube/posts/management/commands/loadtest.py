@@ -0,0 +1,128 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import run
+from core.stats import PERCENTILES
+from posts.loadtest import SCENARIOS, targets, virtual_user
+
+
+def parse_mix(value):
+    """anonymous=60,reader=25 -> {'anonymous': 60, 'reader': 25}."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f'Неизвестный сценарий {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает WSGI-приложение виртуальными пользователями и печатает '
+        'пропускную способность, долю ошибок и процентили задержек.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=8,
+                            help='Сколько пользователей работают сразу.')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Длительность прогона в секундах.')
+        parser.add_argument(
+            '--mix',
+            type=parse_mix,
+            default='anonymous=60,reader=25,commenter=10,poster=5',
+            help='Веса сценариев: ' + ', '.join(SCENARIOS) + '.',
+        )
+        parser.add_argument(
+            '--processes',
+            action='store_true',
+            help='Пользователи в отдельных процессах, а не в потоках.',
+        )
+        parser.add_argument(
+            '--think-time',
+            type=float,
+            default=0,
+            help='Средняя пауза между сценариями в секундах.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', help='Куда записать результаты.')
+
+    def handle(self, *args, users, duration, mix, processes, **options):
+        if settings.DEBUG:
+            # С DEBUG каждое соединение копит все SQL-запросы в памяти
+            self.stderr.write('DEBUG = True: задержки будут завышены.')
+        plan = {
+            'mix': mix,
+            'think_time': options['think_time'],
+            'seed': options['seed'],
+            'targets': targets(),
+        }
+        if not plan['targets']['posts']:
+            raise CommandError('В базе нет постов: см. generate_dataset.')
+        mode = 'процессах' if processes else 'потоках'
+        self.stdout.write(
+            f'{users} пользователей в {mode}, {duration:g} с...'
+        )
+        recorder, elapsed = run(
+            virtual_user, users, duration, plan, processes=processes
+        )
+        self.report(recorder, elapsed)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as stream:
+                json.dump(
+                    self.as_json(recorder, elapsed), stream, indent=2
+                )
+
+    def report(self, recorder, elapsed):
+        total = sum(h.total for h in recorder.histograms.values())
+        errors = sum(recorder.errors.values())
+        self.stdout.write(
+            f'\nЗапросов: {total} за {elapsed:.1f} с, '
+            f'{total / elapsed:.1f} в секунду, '
+            f'ошибок {errors} ({errors / max(total, 1):.2%})'
+        )
+        self.stdout.write('Ответы: ' + ', '.join(
+            f'{status}: {count}'
+            for status, count in sorted(
+                recorder.statuses.items(), key=lambda item: str(item[0])
+            )
+        ))
+        header = ''.join(f'{f"p{percent:g}":>9}' for percent in PERCENTILES)
+        self.stdout.write(
+            f'\n{"мс":<24}{"запросов":>9}{"ошибок":>8}{"в сек":>8}{header}'
+        )
+        for name in sorted(recorder.histograms):
+            histogram = recorder.histograms[name]
+            self.stdout.write(
+                f'{name:<24}{histogram.total:>9}'
+                f'{recorder.errors.get(name, 0):>8}'
+                f'{histogram.total / elapsed:>8.1f}'
+                + ''.join(
+                    f'{value * 1000:>9.1f}'
+                    for value in histogram.summary().values()
+                )
+            )
+
+    def as_json(self, recorder, elapsed):
+        return {
+            'elapsed': elapsed,
+            'statuses': {
+                str(status): count
+                for status, count in recorder.statuses.items()
+            },
+            'urls': {
+                name: {
+                    'errors': recorder.errors.get(name, 0),
+                    'mean': histogram.mean,
+                    'percentiles': {
+                        str(percent): value
+                        for percent, value in histogram.summary().items()
+                    },
+                    'histogram': histogram.to_dict(),
+                }
+                for name, histogram in recorder.histograms.items()
+            },
+        }
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+
+from posts.models import Comment, Post
+from posts.search import SCHEMA, TRIGGERS
+
+
+class Command(BaseCommand):
+    help = 'Пересоздает полнотекстовый индекс постов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Сколько строк индексировать в одной транзакции.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        with connection.cursor() as cursor:
+            for statement in SCHEMA + TRIGGERS:
+                cursor.execute(statement)
+        for model in (Post, Comment):
+            table = model._meta.db_table
+            last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table}_fts ({table}_fts) "
+                    "VALUES ('delete-all')"
+                )
+            indexed = 0
+            for pk_from in range(1, last_pk + 1, batch_size):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(
+                        f'INSERT INTO {table}_fts (rowid, text)'
+                        f' SELECT id, text FROM {table}'
+                        ' WHERE id >= %s AND id < %s',
+                        [pk_from, pk_from + batch_size],
+                    )
+                    indexed += cursor.rowcount
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table}_fts ({table}_fts) "
+                    "VALUES ('optimize')"
+                )
+            self.stdout.write(f'{model.__name__}: проиндексировано {indexed}')
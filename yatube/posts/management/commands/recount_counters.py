@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from users.models import Profile, User
+
+from posts.counters import COUNTERS, recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики пачками по pk.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк пересчитывать в одной транзакции.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        created = Profile.objects.bulk_create(
+            (
+                Profile(user_id=pk)
+                for pk in User.objects.filter(
+                    profile__isnull=True
+                ).values_list('pk', flat=True).iterator()
+            ),
+            # SQLite не принимает больше 500 строк в одном составном SELECT
+            batch_size=min(batch_size, 500),
+        )
+        self.stdout.write(f'Создано профилей: {len(created)}')
+        for model, counters in COUNTERS:
+            last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+            updated = 0
+            for pk_from in range(1, last_pk + 1, batch_size):
+                with transaction.atomic():
+                    updated += recount(
+                        model, counters, pk_from, pk_from + batch_size
+                    )
+            self.stdout.write(f'{model.__name__}: пересчитано {updated}')
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+TOKENIZE = "tokenize='unicode61 remove_diacritics 2'"
+TABLES = ('posts_post', 'posts_comment')
+
+
+def triggers(table):
+    return (
+        f'CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN'
+        f' INSERT INTO {table}_fts (rowid, text) VALUES (new.id, new.text);'
+        ' END',
+        f'CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN'
+        f' INSERT INTO {table}_fts ({table}_fts, rowid, text)'
+        " VALUES ('delete', old.id, old.text);"
+        ' END',
+        f'CREATE TRIGGER {table}_fts_update'
+        f' AFTER UPDATE OF text ON {table} BEGIN'
+        f' INSERT INTO {table}_fts ({table}_fts, rowid, text)'
+        " VALUES ('delete', old.id, old.text);"
+        f' INSERT INTO {table}_fts (rowid, text) VALUES (new.id, new.text);'
+        ' END',
+    )
+
+
+def create(table):
+    return (
+        f'CREATE VIRTUAL TABLE {table}_fts USING fts5('
+        f'text, content={table}, content_rowid=id, {TOKENIZE})',
+        *triggers(table),
+        f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')",
+    )
+
+
+def drop(table):
+    return (
+        f'DROP TRIGGER {table}_fts_insert',
+        f'DROP TRIGGER {table}_fts_delete',
+        f'DROP TRIGGER {table}_fts_update',
+        f'DROP TABLE {table}_fts',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunSQL(create(table), drop(table)) for table in TABLES
+    ]
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+
+from .storage import post_image_storage
 
 User = get_user_model()
 
@@ -8,11 +10,36 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=20, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField('Постов', default=0)
 
     def __str__(self) -> str:
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    # Колонки, которые выводят карточки постов в лентах
+    FEED_FIELDS = (
+        'text',
+        'pub_date',
+        'image',
+        'author',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group',
+        'group__slug',
+        'group__title',
+    )
+
+    def for_feed(self):
+        """Посты для карточек ленты вместе с автором и группой."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def for_detail(self):
+        """Пост для отдельной страницы вместе со счетчиками автора."""
+        return self.select_related('author__profile', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -36,15 +63,52 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_image_storage,
         blank=True
     )
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # Ленты читаются по убыванию (pub_date, id). SQLite обходит индекс
+        # в обе стороны, а rowid неявно замыкает каждый индекс, поэтому
+        # возрастающие индексы отдают этот порядок без сортировки.
+        indexes = (
+            models.Index(
+                name='post_author_date_idx',
+                fields=('author', 'pub_date'),
+            ),
+            models.Index(
+                name='post_group_date_idx',
+                fields=('group', 'pub_date'),
+            ),
+            models.Index(
+                name='post_date_id_idx',
+                fields=('pub_date', 'id'),
+            ),
+            # Сколько постов ссылается на файл картинки
+            models.Index(name='post_image_idx', fields=('image',)),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Хранилище картинок проверяет файл после коммита поста, поэтому
+        # строка поста должна быть закоммичена к вызову on_commit
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_post(self):
+        """Комментарии под постом вместе с именами авторов."""
+        return self.select_related('author').only(
+            'text', 'created', 'post', 'author', 'author__username'
+        ).order_by('created')
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -66,6 +130,16 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                name='comment_post_created_idx',
+                fields=('post', 'created'),
+            ),
+        )
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -94,6 +168,53 @@ class Follow(models.Model):
                 check=~models.Q(user=models.F('author')),
             ),
         )
+        indexes = (
+            models.Index(
+                name='follow_author_user_idx',
+                fields=('author', 'user'),
+            ),
+        )
 
     def __str__(self):
         return f'Юзер {self.user} подписан на автора {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Запись персональной ленты подписок.
+
+    Заполняется при публикации поста (fan-out on write), поэтому
+    страница подписок читается одним диапазоном по индексу
+    (user, pub_date) без join-а через Follow.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                name='unique timeline entry',
+                fields=('user', 'post',),
+            ),
+        )
+        indexes = (
+            models.Index(
+                name='timeline_user_date_idx',
+                fields=('user', 'pub_date', 'post'),
+            ),
+        )
+
+    def __str__(self):
+        return f'Пост {self.post_id} в ленте {self.user_id}'
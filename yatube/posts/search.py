@@ -0,0 +1,255 @@
+import re
+
+from django.db import connection, connections
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .utils import NEXT, CursorPaginator
+
+# Совпадение в комментарии весит вдвое меньше совпадения в тексте поста
+COMMENT_WEIGHT = 0.5
+MAX_TERMS = 10
+SNIPPET_TOKENS = 16
+# Границы подсветки: управляющие символы не встречаются в тексте
+# после escape(), поэтому их безопасно заменить на теги
+MARK_START, MARK_END = '\x02', '\x03'
+
+# Индексы с внешним содержимым: FTS хранит только словарь, тексты
+# остаются в posts_post и posts_comment. Триггеры держат их в синхроне.
+# Django пересоздает таблицу SQLite при изменении полей модели и теряет
+# триггеры, поэтому после каждого migrate их восстанавливает
+# restore_triggers(), а rebuild_search_index создает все заново.
+SCHEMA = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5('
+    ' text, content=posts_post, content_rowid=id,'
+    " tokenize='unicode61 remove_diacritics 2')",
+    'CREATE VIRTUAL TABLE IF NOT EXISTS posts_comment_fts USING fts5('
+    ' text, content=posts_comment, content_rowid=id,'
+    " tokenize='unicode61 remove_diacritics 2')",
+)
+TRIGGERS = tuple(
+    statement
+    for table in ('posts_post', 'posts_comment')
+    for statement in (
+        f'CREATE TRIGGER IF NOT EXISTS {table}_fts_insert'
+        f' AFTER INSERT ON {table} BEGIN'
+        f' INSERT INTO {table}_fts (rowid, text) VALUES (new.id, new.text);'
+        ' END',
+        f'CREATE TRIGGER IF NOT EXISTS {table}_fts_delete'
+        f' AFTER DELETE ON {table} BEGIN'
+        f' INSERT INTO {table}_fts ({table}_fts, rowid, text)'
+        " VALUES ('delete', old.id, old.text);"
+        ' END',
+        f'CREATE TRIGGER IF NOT EXISTS {table}_fts_update'
+        f' AFTER UPDATE OF text ON {table} BEGIN'
+        f' INSERT INTO {table}_fts ({table}_fts, rowid, text)'
+        " VALUES ('delete', old.id, old.text);"
+        f' INSERT INTO {table}_fts (rowid, text) VALUES (new.id, new.text);'
+        ' END',
+    )
+)
+
+TRIGGER_NAMES = tuple(statement.split()[5] for statement in TRIGGERS)
+
+RANKED_SQL = '''
+    WITH matches (post_id, rank) AS (
+        SELECT rowid, bm25(posts_post_fts)
+        FROM posts_post_fts WHERE posts_post_fts MATCH %s
+        UNION ALL
+        SELECT comment.post_id, bm25(posts_comment_fts) * %s
+        FROM posts_comment_fts
+        JOIN posts_comment AS comment ON comment.id = posts_comment_fts.rowid
+        WHERE posts_comment_fts MATCH %s
+    )
+    SELECT post_id, MIN(rank) AS rank FROM matches GROUP BY post_id
+'''
+
+
+def restore_triggers(using):
+    """Создает недостающие триггеры и переиндексирует их таблицы.
+
+    Пока триггеров не было, индекс мог отстать от таблицы. Возвращает
+    имена созданных триггеров.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+        )
+        existing = {name for name, in cursor.fetchall()}
+        created = []
+        for table in ('posts_post', 'posts_comment'):
+            # Без таблицы индекса миграция 0018 еще не применена
+            if f'{table}_fts' not in existing:
+                continue
+            missing = [
+                (name, statement)
+                for name, statement in zip(TRIGGER_NAMES, TRIGGERS)
+                if name.startswith(f'{table}_fts_') and name not in existing
+            ]
+            if not missing:
+                continue
+            for name, statement in missing:
+                cursor.execute(statement)
+                created.append(name)
+            cursor.execute(
+                f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')"
+            )
+    return created
+
+
+def fts_query(text):
+    """Запрос пользователя как выражение FTS5: все слова, последнее —
+    по префиксу. Кавычки не дают синтаксису FTS5 попасть в запрос."""
+    terms = re.findall(r'\w+', text.lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+class RawSubquery(RawSQL):
+    """RawSQL для pk__in без своих скобок.
+
+    Lookup in сам берет подзапрос в скобки, а из ((SELECT ...)) SQLite
+    взял бы только первую строку, как из скалярного подзапроса.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def filter_posts(queryset, text):
+    """Посты queryset, в тексте которых есть слова запроса."""
+    return queryset.filter(pk__in=RawSubquery(
+        'SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s',
+        [fts_query(text)],
+    ))
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def snippets(query, post_ids):
+    """Фрагменты с подсветкой: из текста поста, иначе из комментария."""
+    if not post_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(post_ids))
+    found = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT rowid, snippet(posts_post_fts, 0, %s, %s, %s, %s)'
+            ' FROM posts_post_fts WHERE posts_post_fts MATCH %s'
+            f' AND rowid IN ({placeholders})',
+            [MARK_START, MARK_END, '…', SNIPPET_TOKENS, query, *post_ids],
+        )
+        found.update(cursor.fetchall())
+        missing = [pk for pk in post_ids if pk not in found]
+        if missing:
+            placeholders = ', '.join(['%s'] * len(missing))
+            cursor.execute(
+                'SELECT comment.post_id,'
+                ' snippet(posts_comment_fts, 0, %s, %s, %s, %s)'
+                ' FROM posts_comment_fts JOIN posts_comment AS comment'
+                ' ON comment.id = posts_comment_fts.rowid'
+                ' WHERE posts_comment_fts MATCH %s'
+                f' AND comment.post_id IN ({placeholders})'
+                ' ORDER BY bm25(posts_comment_fts)',
+                [MARK_START, MARK_END, '…', SNIPPET_TOKENS, query, *missing],
+            )
+            for pk, snippet in cursor.fetchall():
+                found.setdefault(pk, snippet)
+    return {pk: highlight(snippet) for pk, snippet in found.items()}
+
+
+class SearchPaginator(CursorPaginator):
+    """Результаты поиска по релевантности, с курсором по (rank, id).
+
+    bm25 тем меньше, чем лучше совпадение, поэтому "следующие"
+    результаты идут по возрастанию ключа, а не по убыванию, как в лентах.
+    """
+
+    def __init__(self, query, per_page):
+        super().__init__(
+            Post.objects.none(), per_page,
+            date_field='search_rank', id_field='pk',
+        )
+        self.query = query
+
+    def dump_key(self, value):
+        return value
+
+    def load_key(self, value):
+        return float(value)
+
+    def ranked(self, where='', params=(), descending=False, limit=None,
+               offset=0):
+        order = 'DESC' if descending else 'ASC'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id, rank FROM ({RANKED_SQL}) {where}'
+                f' ORDER BY rank {order}, post_id {order} LIMIT %s OFFSET %s',
+                [self.query, COMMENT_WEIGHT, self.query, *params,
+                 limit, offset],
+            )
+            return cursor.fetchall()
+
+    def load(self, rows):
+        """Посты в порядке выдачи, с рангом и подсвеченным фрагментом."""
+        posts = Post.objects.for_feed().in_bulk([pk for pk, _ in rows])
+        found = snippets(self.query, list(posts))
+        objects = []
+        for pk, rank in rows:
+            if pk in posts:
+                post = posts[pk]
+                post.search_rank = rank
+                post.snippet = found.get(pk)
+                objects.append(post)
+        return objects
+
+    def offset_page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = self.ranked(limit=self.per_page + 1, offset=bottom)
+        if not rows and number > 1:
+            return self.offset_page(
+                self.last_number(len(self.ranked(limit=bottom)))
+            )
+        return self.build_page(
+            self.load(rows[:self.per_page]),
+            number,
+            has_previous=number > 1,
+            has_next=len(rows) > self.per_page,
+        )
+
+    def cursor_page(self, rank, pk, direction, number):
+        if direction == NEXT:
+            rows = self.ranked(
+                'WHERE rank > %s OR (rank = %s AND post_id > %s)',
+                (rank, rank, pk),
+                limit=self.per_page + 1,
+            )
+            objects = self.load(rows[:self.per_page])
+            return self.build_page(
+                objects,
+                number,
+                has_previous=bool(objects),
+                has_next=len(rows) > self.per_page,
+            )
+        rows = self.ranked(
+            'WHERE rank < %s OR (rank = %s AND post_id < %s)',
+            (rank, rank, pk),
+            descending=True,
+            limit=self.per_page + 1,
+        )
+        objects = self.load(rows[:self.per_page][::-1])
+        return self.build_page(
+            objects,
+            number,
+            has_previous=len(rows) > self.per_page,
+            has_next=bool(objects),
+        )
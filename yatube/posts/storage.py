@@ -0,0 +1,73 @@
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(r'(.+/)?([0-9a-f]{2})/\2[0-9a-f]{62}(\.\w+)?')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под именем из хеша содержимого.
+
+    Одинаковые загрузки получают одно имя, поэтому файл на диске и его
+    миниатюры sorl общие для всех постов. Удаляет файл posts.images.release,
+    когда на него не ссылается ни один пост.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def is_hashed(self, name):
+        """Имя выдано этим хранилищем, а не осталось от старых загрузок."""
+        return bool(HASHED_NAME.fullmatch(name))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Пока пост с этим именем не закоммичен, posts.images.release
+            # другого процесса может счесть файл ненужным и удалить его.
+            # После коммита файл возвращается на место, если пропал
+            data = ContentFile(b''.join(content.chunks()))
+            transaction.on_commit(lambda: self.restore(name, data))
+            return name
+        # Одновременная загрузка того же файла получит суффикс в имени:
+        # это лишняя копия, но не ошибка
+        return super().save(name, content, max_length)
+
+    def restore(self, name, content):
+        if self.exists(name):
+            return
+        temporary = super().save(f'{name}.restore', content)
+        os.replace(self.path(temporary), self.path(name))
+
+    def hide(self, name):
+        """Атомарно убирает файл из-под его имени.
+
+        Возвращает новое имя файла или None, если файла уже нет.
+        """
+        hidden = f'{name}.{uuid.uuid4().hex}.deleted'
+        try:
+            os.rename(self.path(name), self.path(hidden))
+        except FileNotFoundError:
+            return None
+        return hidden
+
+    def unhide(self, hidden, name):
+        os.replace(self.path(hidden), self.path(name))
+
+
+post_image_storage = ContentAddressedStorage()
@@ -0,0 +1,12 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts, geometry_string, **options):
+    """Готовит post.thumbnail для всей страницы ленты разом."""
+    thumbnails.prefetch_thumbnails(list(posts), geometry_string, **options)
+    return ''
@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..admin import EstimatedCountPaginator
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangeListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'group-{i}') for i in range(5)
+        )
+        cls.groups = list(Group.objects.order_by('slug'))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        prefix = f'author-{User.objects.count()}-'
+        User.objects.bulk_create(
+            User(username=f'{prefix}{i}') for i in range(count)
+        )
+        authors = User.objects.filter(username__startswith=prefix)
+        Post.objects.bulk_create(
+            Post(author=author, text='Пост', group=self.groups[i % 5])
+            for i, author in enumerate(authors)
+        )
+        posts = Post.objects.filter(author__in=authors)
+        Comment.objects.bulk_create(
+            Comment(post=post, author=post.author, text='Комментарий')
+            for post in posts
+        )
+        Follow.objects.bulk_create(
+            Follow(user=self.admin, author=author) for author in authors
+        )
+        return posts
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_constant_queries(self):
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                url = reverse(f'admin:posts_{model}_changelist')
+                self.add_rows(3)
+                few = self.count_queries(url)
+                self.add_rows(30)
+                self.assertEqual(self.count_queries(url), few)
+
+    def test_editable_group_choices(self):
+        post = self.add_rows(1)[0]
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'Группа 4')
+        response = self.client.post(
+            reverse('admin:posts_post_changelist'),
+            {
+                'form-TOTAL_FORMS': 1,
+                'form-INITIAL_FORMS': 1,
+                'form-0-id': post.pk,
+                'form-0-group': self.groups[2].pk,
+                '_save': 'Сохранить',
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        post.refresh_from_db()
+        self.assertEqual(post.group, self.groups[2])
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=10)
+    def test_estimated_count(self):
+        self.add_rows(12)
+        paginator = EstimatedCountPaginator(Post.objects.all(), 5)
+        self.assertGreaterEqual(paginator.count, 12)
+        filtered = Post.objects.filter(group=self.groups[0])
+        self.assertEqual(EstimatedCountPaginator(filtered, 5).count, 3)
+        filtered = Post.objects.filter(group__isnull=False)
+        paginator = EstimatedCountPaginator(filtered, 5)
+        self.assertEqual(paginator.count, 11)
+        self.assertEqual(paginator.lower_bound, 10)
+        paginator = EstimatedCountPaginator(Post.objects.all()[:0], 5)
+        self.assertEqual(paginator.count, 0)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'пост'}
+        )
+        self.assertContains(response, 'больше 10 posts')
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertNotContains(response, 'больше')
+
+    def test_change_forms_do_not_list_related_rows(self):
+        post = self.add_rows(1)[0]
+        comment = Comment.objects.get(post=post)
+        follow = Follow.objects.get(author=post.author)
+        urls = (
+            reverse('admin:posts_post_change', args=(post.pk,)),
+            reverse('admin:posts_comment_change', args=(comment.pk,)),
+            reverse('admin:posts_follow_change', args=(follow.pk,)),
+        )
+        # Первый запрос еще заполняет кэш ContentType
+        for url in urls:
+            self.count_queries(url)
+        few = [self.count_queries(url) for url in urls]
+        self.add_rows(30)
+        self.assertEqual([self.count_queries(url) for url in urls], few)
+        response = self.client.get(urls[1])
+        self.assertNotContains(response, 'author-2-0')
+
+    def test_user_autocomplete_by_prefix(self):
+        self.add_rows(25)
+        url = reverse('admin:auth_user_autocomplete')
+        response = self.client.get(url, {'term': 'author-1-2'})
+        self.assertEqual(
+            [result['text'] for result in response.json()['results']],
+            ['author-1-2', *(f'author-1-{i}' for i in range(20, 25))],
+        )
+        response = self.client.get(url, {'term': 'thor'})
+        self.assertEqual(response.json()['results'], [])
+        response = self.client.get(url)
+        self.assertTrue(response.json()['pagination']['more'])
+
+    def test_user_changelist_search(self):
+        User.objects.create_user(
+            'reader', 'reader@mail.test', first_name='Иван'
+        )
+        url = reverse('admin:auth_user_changelist')
+        for term in ('EADE', 'Иван', 'mail.test'):
+            with self.subTest(term=term):
+                response = self.client.get(url, {'q': term})
+                self.assertEqual(
+                    list(response.context['cl'].result_list.values_list(
+                        'username', flat=True
+                    )),
+                    ['reader'],
+                )
+
+    def test_post_autocomplete(self):
+        post = self.add_rows(1)[0]
+        Post.objects.create(author=post.author, text='Другой текст')
+        response = self.client.get(
+            reverse('admin:posts_post_autocomplete'), {'term': 'дру'}
+        )
+        self.assertEqual(
+            [result['text'] for result in response.json()['results']],
+            ['Другой текст'],
+        )
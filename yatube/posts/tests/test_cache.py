@@ -1,8 +1,28 @@
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase
 from django.urls import reverse
+from core.cache import bump
 
-from ..models import Post, User
+from ..cache import INDEX_FEED
+from ..models import Group, Post, User
+
+
+def commit_after_read(feed):
+    """execute_wrapper, имитирующий коммит чужой транзакции.
+
+    Версия ленты сбрасывается сразу после того, как view прочитал посты.
+    """
+    bumped = []
+
+    def wrapper(execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if not bumped and sql.startswith('SELECT') and 'posts_post' in sql:
+            bumped.append(sql)
+            bump(feed)
+        return result
+
+    return wrapper
 
 
 class CacheTests(TestCase):
@@ -10,26 +30,128 @@ class CacheTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='username')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание',
+        )
         cls.post = Post.objects.create(
             author=cls.user,
-            text='Тестовый пост'
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.user.username]),
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
     def test_cache(self):
         url = reverse('posts:index')
         response_1 = self.authorized_client.get(url)
-        post_0 = response_1.context['page_obj'][0]
-        post_0.delete()
-        Post.objects.create(
-            author=self.user,
-            text='Тестовый пост 2'
-        )
+        # Изменение в обход сигналов не сбрасывает версию ленты
+        Post.objects.filter(pk=self.post.pk).update(text='Другой текст')
         response_2 = self.authorized_client.get(url)
         self.assertEqual(response_1.content, response_2.content)
-        cache.clear()
+        bump(INDEX_FEED)
         response_3 = self.authorized_client.get(url)
         self.assertNotEqual(response_1.content, response_3.content)
+
+    def test_new_post_is_shown_at_once(self):
+        for url in self.urls:
+            self.authorized_client.get(url)
+        Post.objects.create(
+            author=self.user,
+            text='Свежий пост',
+            group=self.group,
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Свежий пост')
+
+    def test_page_read_before_commit_is_not_cached_as_fresh(self):
+        url = reverse('posts:index')
+        with connection.execute_wrapper(commit_after_read(INDEX_FEED)):
+            self.authorized_client.get(url)
+        # Данные, которые закоммитила та транзакция
+        Post.objects.update(text='Другой текст')
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Другой текст')
+
+    def test_edited_and_deleted_post_are_refreshed(self):
+        for url in self.urls:
+            self.authorized_client.get(url)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Исправленный пост')
+        self.post.delete()
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, 'Исправленный пост')
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.other_post = Post.objects.create(author=cls.other, text='Чужой')
+        cls.detail_url = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.other_url = reverse('posts:profile', args=[cls.other.username])
+
+    def setUp(self):
+        cache.clear()
+
+    def assertCached(self, url, cached=True):
+        # Ответ из кэша страниц не проходит через шаблоны
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context is None, cached)
+        return response
+
+    def test_anonymous_pages_are_cached(self):
+        for url in (reverse('posts:index'), self.detail_url, self.other_url):
+            with self.subTest(url=url):
+                self.assertCached(url, cached=False)
+                self.assertCached(url)
+
+    def test_page_read_before_commit_is_not_cached_as_fresh(self):
+        index_url = reverse('posts:index')
+        with connection.execute_wrapper(commit_after_read(INDEX_FEED)):
+            self.assertCached(index_url, cached=False)
+        Post.objects.update(text='Другой текст')
+        response = self.assertCached(index_url, cached=False)
+        self.assertContains(response, 'Другой текст')
+
+    def test_logged_in_pages_are_not_cached(self):
+        self.client.force_login(self.author)
+        self.assertCached(self.detail_url, cached=False)
+        self.assertCached(self.detail_url, cached=False)
+
+    def test_comment_purges_only_its_post(self):
+        self.assertCached(self.detail_url, cached=False)
+        self.assertCached(self.other_url, cached=False)
+        self.post.comments.create(author=self.other, text='Комментарий')
+        response = self.assertCached(self.detail_url, cached=False)
+        self.assertContains(response, 'Комментарий')
+        self.assertCached(self.other_url)
+
+    def test_post_edit_purges_pages_showing_it(self):
+        index_url = reverse('posts:index')
+        self.assertCached(index_url, cached=False)
+        self.other_post.text = 'Исправленный'
+        self.other_post.save()
+        response = self.assertCached(index_url, cached=False)
+        self.assertContains(response, 'Исправленный')
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from users.models import Profile
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='group',
+            description='Описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other',
+            description='Описание',
+        )
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        for field, value in expected.items():
+            with self.subTest(obj=obj, field=field):
+                self.assertEqual(getattr(obj, field), value)
+
+    def test_post_counters(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        self.assertCounters(self.author.profile, posts_count=1)
+        self.assertCounters(self.group, posts_count=1)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(self.group, posts_count=0)
+        self.assertCounters(self.other_group, posts_count=1)
+        post.delete()
+        self.assertCounters(self.author.profile, posts_count=0)
+        self.assertCounters(self.other_group, posts_count=0)
+
+    def test_comment_counter(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        self.assertCounters(post, comments_count=1)
+        comment.delete()
+        self.assertCounters(post, comments_count=0)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCounters(self.author.profile, followers_count=1)
+        self.assertCounters(self.reader.profile, following_count=1)
+        follow.delete()
+        self.assertCounters(self.author.profile, followers_count=0)
+        self.assertCounters(self.reader.profile, following_count=0)
+
+    def test_recount_command_fixes_drift(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Profile.objects.update(
+            posts_count=42, followers_count=42, following_count=42
+        )
+        Group.objects.update(posts_count=42)
+        Post.objects.update(comments_count=42)
+        Profile.objects.filter(user=self.reader).delete()
+        call_command('recount_counters', batch_size=1, stdout=StringIO())
+        self.assertCounters(
+            self.author.profile,
+            posts_count=1, followers_count=1, following_count=0,
+        )
+        self.assertCounters(self.group, posts_count=1)
+        self.assertCounters(post, comments_count=1)
+        self.assertEqual(
+            Profile.objects.get(user=self.reader).following_count, 1
+        )
+
+    def test_pages_of_user_without_profile(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Profile.objects.filter(user=self.author).delete()
+        urls = (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['posts_count'], 1)
+        self.assertCounters(
+            Profile.objects.get(user=self.author),
+            posts_count=1, followers_count=1,
+        )
@@ -0,0 +1,87 @@
+from collections import Counter
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TransactionTestCase
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+
+OPTIONS = {
+    'users': 60,
+    'groups': 3,
+    'posts': 120,
+    'comments': 90,
+    'follows': 6,
+    'skew': 1.5,
+    'batch_size': 25,
+    'end': datetime(2024, 1, 1, tzinfo=timezone.utc),
+    'seed': 7,
+}
+
+
+def snapshot():
+    return (
+        list(User.objects.order_by('pk').values_list(
+            'username', 'first_name', 'last_name'
+        )),
+        list(Group.objects.order_by('pk').values_list('slug', 'title')),
+        list(Post.objects.order_by('pk').values_list(
+            'author__username', 'group__slug', 'text', 'pub_date'
+        )),
+        list(Comment.objects.order_by('pk').values_list(
+            'post__text', 'author__username', 'text', 'created'
+        )),
+        sorted(Follow.objects.values_list(
+            'user__username', 'author__username'
+        )),
+    )
+
+
+class GenerateDatasetTests(TransactionTestCase):
+    """TransactionTestCase: строки пишутся с явными id из Max(pk)."""
+
+    def generate(self, **options):
+        call_command(
+            'generate_dataset', **{**OPTIONS, **options},
+            stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def test_counts_and_follow_skew(self):
+        self.generate(workers=2)
+        self.assertEqual(User.objects.count(), 60)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 90)
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')
+        ).exists())
+        followers = Counter(Follow.objects.values_list(
+            'author_id', flat=True
+        ))
+        counts = sorted(followers.values(), reverse=True)
+        self.assertGreater(counts[0], 5 * counts[len(counts) // 2])
+        top = User.objects.get(pk=followers.most_common(1)[0][0])
+        self.assertEqual(top.profile.followers_count, counts[0])
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            sum(
+                followers[author_id]
+                for author_id in Post.objects.values_list(
+                    'author_id', flat=True
+                )
+            ),
+        )
+
+    def test_same_seed_same_data(self):
+        self.generate(workers=2)
+        first = snapshot()
+        for model in (Post, Follow, Group, User):
+            model.objects.all().delete()
+        self.generate(workers=1)
+        self.assertEqual(snapshot(), first)
+        for model in (Post, Follow, Group, User):
+            model.objects.all().delete()
+        self.generate(workers=1, seed=8)
+        self.assertNotEqual(snapshot(), first)
@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+from io import BytesIO
+
+from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from ..forms import PostForm
+from ..images import normalize_image
+
+ORIENTATION = 0x0112
+MAKE = 0x010F
+# Сколько памяти сверх уже занятой может стоить одна загрузка
+RSS_LIMIT_MB = 120
+MAKE_JPEG_SCRIPT = textwrap.dedent('''
+    import sys
+    from PIL import Image
+    Image.new('RGB', (8000, 6000), 'green').save(sys.argv[1], 'JPEG')
+''')
+RSS_SCRIPT = textwrap.dedent('''
+    import os, resource, sys
+    import django
+    django.setup()
+    from django.core.files.uploadedfile import TemporaryUploadedFile
+    from PIL import Image
+    from posts.images import normalize_image
+
+    upload = TemporaryUploadedFile('huge.jpg', 'image/jpeg', 0, None)
+    with open(sys.argv[1], 'rb') as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b''):
+            upload.write(chunk)
+    upload.size = upload.tell()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    normalized = normalize_image(upload)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print((after - before) // 1024, Image.open(normalized).size)
+''')
+
+
+def make_upload(name, image, image_format, **options):
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    return SimpleUploadedFile(name, output.getvalue())
+
+
+class NormalizeImageTests(SimpleTestCase):
+    def test_exif_orientation_applied_and_metadata_stripped(self):
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        exif[MAKE] = 'Камера'
+        upload = make_upload(
+            'photo.jpeg', Image.new('RGB', (400, 200)), 'JPEG',
+            exif=exif.tobytes(),
+        )
+        normalized = Image.open(normalize_image(upload))
+        self.assertEqual(normalized.format, 'JPEG')
+        self.assertEqual(normalized.size, (200, 400))
+        self.assertEqual(dict(normalized.getexif()), {})
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_size_capped(self):
+        upload = make_upload('wide.gif', Image.new('P', (1000, 250)), 'GIF')
+        normalized = normalize_image(upload)
+        self.assertEqual(normalized.name, 'wide.jpg')
+        self.assertEqual(Image.open(normalized).size, (100, 25))
+
+    def test_transparency_kept_in_png(self):
+        upload = make_upload(
+            'logo.png', Image.new('RGBA', (20, 20), (0, 0, 0, 0)), 'PNG'
+        )
+        normalized = Image.open(normalize_image(upload))
+        self.assertEqual(normalized.format, 'PNG')
+        self.assertEqual(normalized.mode, 'RGBA')
+
+    def test_rss_bounded_for_huge_jpeg(self):
+        """48-мегапиксельный JPEG не декодируется целиком."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'huge.jpg')
+            # Картинка создается отдельным процессом, чтобы не поднять
+            # пиковую память того, кто ее загружает
+            subprocess.run([sys.executable, '-c', MAKE_JPEG_SCRIPT, path],
+                           check=True)
+            result = subprocess.run(
+                [sys.executable, '-c', RSS_SCRIPT, path],
+                cwd=settings.BASE_DIR,
+                env={
+                    **os.environ,
+                    'DJANGO_SETTINGS_MODULE': 'yatube.settings',
+                },
+                stdout=subprocess.PIPE,
+                check=True,
+                universal_newlines=True,
+            )
+        growth, size = result.stdout.split(' ', 1)
+        self.assertEqual(size.strip(), '(2048, 1536)')
+        # Полное декодирование — 8000 * 6000 * 4 байт, больше 180 МБ
+        self.assertLess(int(growth), RSS_LIMIT_MB)
+
+
+class PostFormImageTests(SimpleTestCase):
+    def form(self, upload):
+        return PostForm(data={'text': 'Текст'}, files={'image': upload})
+
+    def test_image_field_type(self):
+        self.assertIs(type(PostForm().fields['image']), forms.ImageField)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_pixel_limit(self):
+        form = self.form(
+            make_upload('big.png', Image.new('RGB', (20, 20)), 'PNG')
+        )
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'too_many_pixels')
+
+    @override_settings(POST_IMAGE_MAX_BYTES=10)
+    def test_byte_limit(self):
+        form = self.form(
+            make_upload('big.png', Image.new('RGB', (20, 20)), 'PNG')
+        )
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'file_too_large')
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class LoadtestCommandTest(TransactionTestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.bulk_create(
+            Post(author=author, group=group, text=f'Пост {number}')
+            for number in range(5)
+        )
+
+    def test_threads_run_every_scenario_without_errors(self):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        out = StringIO()
+        # Общая база в памяти у тестов блокирует таблицы при параллельной
+        # записи, поэтому пользователь один
+        call_command(
+            'loadtest',
+            users=1,
+            duration=1,
+            mix={'anonymous': 1, 'reader': 1, 'commenter': 1, 'poster': 1},
+            json=path,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        with open(path, encoding='utf-8') as stream:
+            result = json.load(stream)
+        self.assertIn('GET index', result['urls'])
+        self.assertIn('POST add_comment', result['urls'])
+        for name, url in result['urls'].items():
+            with self.subTest(name=name):
+                self.assertEqual(url['errors'], 0)
+                self.assertGreater(url['histogram']['total'], 0)
+        self.assertTrue(Comment.objects.exists())
+        self.assertGreater(Post.objects.count(), 5)
+        self.assertIn('в секунду', out.getvalue())
+
+    def test_empty_database(self):
+        Post.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('loadtest', duration=0.1, stdout=StringIO(),
+                         stderr=StringIO())
@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, User
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост #{i}') for i in range(25)
+        )
+        cls.posts = list(Post.objects.order_by('-pub_date', '-pk'))
+        cls.url = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_navigation(self):
+        page_1 = self.client.get(self.url).context['page_obj']
+        self.assertEqual(list(page_1), self.posts[:10])
+        self.assertFalse(page_1.has_previous())
+        self.assertTrue(page_1.has_next())
+
+        cursor = page_1.paginator.next_cursor
+        page_2 = self.client.get(self.url, {'cursor': cursor}).context[
+            'page_obj'
+        ]
+        self.assertEqual(list(page_2), self.posts[10:20])
+        self.assertTrue(page_2.has_previous())
+        self.assertEqual(page_2.number, 2)
+
+        cursor = page_2.paginator.next_cursor
+        page_3 = self.client.get(self.url, {'cursor': cursor}).context[
+            'page_obj'
+        ]
+        self.assertEqual(list(page_3), self.posts[20:])
+        self.assertFalse(page_3.has_next())
+        self.assertEqual(page_3.number, 3)
+
+        cursor = page_3.paginator.previous_cursor
+        back = self.client.get(self.url, {'cursor': cursor}).context[
+            'page_obj'
+        ]
+        self.assertEqual(list(back), self.posts[10:20])
+        self.assertEqual(back.number, 2)
+
+    def test_page_number_still_works(self):
+        page = self.client.get(self.url, {'page': 3}).context['page_obj']
+        self.assertEqual(list(page), self.posts[20:])
+        self.assertEqual(page.number, 3)
+
+    def test_page_past_the_end_shows_last_page(self):
+        page = self.client.get(self.url, {'page': 5}).context['page_obj']
+        self.assertEqual(list(page), self.posts[20:])
+        self.assertEqual(page.number, 3)
+
+    @override_settings(PAGINATOR_OFFSET_PAGES=2)
+    def test_deep_page_number_is_not_found(self):
+        response = self.client.get(self.url, {'page': 3})
+        self.assertEqual(response.status_code, 404)
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        page = self.client.get(self.url, {'cursor': 'garbage'}).context[
+            'page_obj'
+        ]
+        self.assertEqual(list(page), self.posts[:10])
+
+    def test_no_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        for query in queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_cached_feed_skips_posts_query(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertContains(response, self.posts[0].text)
+        for query in queries:
+            self.assertNotIn('"posts_post"', query['sql'])
@@ -0,0 +1,251 @@
+import re
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, TestCase, override_settings
+from django.urls import URLPattern, reverse
+
+from about.urls import urlpatterns as about_urls
+from users.urls import urlpatterns as users_urls
+
+from ..models import Group, Post, User
+from ..urls import urlpatterns as posts_urls
+
+DATASET = {
+    'users': 60,
+    'groups': 5,
+    'posts': 600,
+    'comments': 1500,
+    'follows': 10,
+    'batch_size': 200,
+    'workers': 1,
+    'end': datetime(2024, 1, 1, tzinfo=timezone.utc),
+    'seed': 3,
+}
+# Наибольшее число SQL-запросов с пустым кэшем; оно не должно зависеть
+# от размера страницы и числа комментариев
+BUDGETS = {
+    'posts:index': 1,
+    'posts:group_posts': 2,
+    'posts:profile': 5,
+    'posts:post_detail': 2,
+    'posts:post_create': 3,
+    'posts:post_edit': 4,
+    'posts:add_comment': 5,
+    'posts:follow_index': 3,
+    'posts:search': 4,
+    'posts:profile_follow': 4,
+    'posts:profile_unfollow': 8,
+    'users:login': 0,
+    'users:logout': 0,
+    'users:signup': 0,
+    'about:author': 0,
+    'about:tech': 0,
+}
+# SQLite до 3.36 пишет SCAN TABLE имя, новее — просто SCAN имя
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+TEMP_ORDER = 'USE TEMP B-TREE FOR ORDER BY'
+# Разрешенные исключения: группы для списка в форме поста выбираются
+# целиком, а найденное поиском сортируется по релевантности bm25, для
+# которой индекса нет; сортируются только совпадения
+ALLOWED_STEPS = {
+    'posts:post_create': {'SCAN posts_group'},
+    'posts:post_edit': {'SCAN posts_group'},
+    'posts:search': {'SCAN matches', TEMP_ORDER},
+}
+STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def url_names():
+    return {
+        f'{namespace}:{pattern.name}'
+        for namespace, patterns in (
+            ('posts', posts_urls),
+            ('users', users_urls),
+            ('about', about_urls),
+        )
+        for pattern in patterns
+        if isinstance(pattern, URLPattern) and pattern.name
+    }
+
+
+class Queries:
+    """execute_wrapper, который запоминает SQL и параметры."""
+
+    def __init__(self):
+        self.executed = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many:
+            self.executed.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def plan(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def allowed_step(step, allowed):
+    return step.replace('SCAN TABLE ', 'SCAN ', 1) in allowed
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов и планы каждого именованного URL на наборе данных.
+
+    Запросы идут с пустым кэшем, иначе считать было бы нечего. Каждый
+    URL проверяется в нескольких вариантах: с разным размером страницы
+    или с постами, у которых много и мало комментариев.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_dataset', **DATASET,
+            stdout=StringIO(), stderr=StringIO(),
+        )
+        cls.author = User.objects.annotate(
+            number=Count('posts')
+        ).order_by('-number', 'pk').first()
+        cls.reader = User.objects.annotate(
+            number=Count('follower')
+        ).exclude(pk=cls.author.pk).order_by('-number', 'pk').first()
+        cls.group = Group.objects.annotate(
+            number=Count('posts')
+        ).order_by('-number', 'pk').first()
+        by_comments = Post.objects.filter(author=cls.author).annotate(
+            number=Count('comments')
+        )
+        cls.busy_post = by_comments.order_by('-number', 'pk').first()
+        cls.quiet_post = by_comments.order_by('number', 'pk').first()
+
+    def setUp(self):
+        self.anonymous = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self, client, name, *args, **params):
+        return [
+            (f'ITEMS_COUNT={size}', {'ITEMS_COUNT': size}, client, 'get',
+             reverse(name, args=args), params)
+            for size in (5, 30)
+        ]
+
+    def per_post(self, client, method, name, data=None):
+        return [
+            (f'комментариев {post.comments.count()}', {}, client, method,
+             reverse(name, args=[post.pk]), data or {})
+            for post in (self.quiet_post, self.busy_post)
+        ]
+
+    def once(self, client, method, name, *args, data=None):
+        return [('', {}, client, method, reverse(name, args=args), data or {})]
+
+    def requests(self):
+        """Варианты запроса к каждому URL.
+
+        Вариант — подпись, настройки, клиент, метод, URL и данные.
+        """
+        author = self.author.username
+        return {
+            'posts:index': self.feed(self.anonymous, 'posts:index'),
+            'posts:group_posts': self.feed(
+                self.anonymous, 'posts:group_posts', self.group.slug
+            ),
+            'posts:profile': self.feed(
+                self.reader_client, 'posts:profile', author
+            ),
+            'posts:post_detail': self.per_post(
+                self.anonymous, 'get', 'posts:post_detail'
+            ),
+            'posts:post_create': self.once(
+                self.author_client, 'get', 'posts:post_create'
+            ),
+            'posts:post_edit': self.per_post(
+                self.author_client, 'get', 'posts:post_edit'
+            ),
+            'posts:add_comment': self.per_post(
+                self.reader_client, 'post', 'posts:add_comment',
+                {'text': 'Комментарий'},
+            ),
+            'posts:follow_index': self.feed(
+                self.reader_client, 'posts:follow_index', page=2
+            ),
+            'posts:search': self.feed(self.anonymous, 'posts:search', q='а'),
+            'posts:profile_follow': self.once(
+                self.reader_client, 'get', 'posts:profile_follow',
+                User.objects.exclude(
+                    follower__user=self.reader
+                ).exclude(pk=self.reader.pk).first().username,
+            ),
+            'posts:profile_unfollow': self.once(
+                self.reader_client, 'get', 'posts:profile_unfollow',
+                self.reader.follower.first().author.username,
+            ),
+            'users:login': self.once(self.anonymous, 'get', 'users:login'),
+            'users:logout': self.once(self.anonymous, 'get', 'users:logout'),
+            'users:signup': self.once(self.anonymous, 'get', 'users:signup'),
+            'about:author': self.once(self.anonymous, 'get', 'about:author'),
+            'about:tech': self.once(self.anonymous, 'get', 'about:tech'),
+        }
+
+    def measure(self, client, method, url, data):
+        cache.clear()
+        queries = Queries()
+        with connection.execute_wrapper(queries):
+            response = getattr(client, method)(url, data)
+        self.assertLess(response.status_code, 400, url)
+        return queries.executed
+
+    def test_every_url_has_a_budget(self):
+        self.assertEqual(set(BUDGETS), url_names())
+        self.assertEqual(set(self.requests()), url_names())
+
+    def test_query_counts_fit_budget(self):
+        for name, variants in self.requests().items():
+            counts = {}
+            for label, settings, client, method, url, data in variants:
+                with self.subTest(url=name, variant=label):
+                    with override_settings(**settings):
+                        executed = self.measure(client, method, url, data)
+                    counts[label] = len(executed)
+                    self.assertLessEqual(
+                        len(executed), BUDGETS[name],
+                        f'{name} ({label}): {len(executed)} запросов при '
+                        f'бюджете {BUDGETS[name]}:\n'
+                        + '\n'.join(sql for sql, _ in executed),
+                    )
+            with self.subTest(url=name):
+                self.assertEqual(
+                    len(set(counts.values())), 1,
+                    f'{name}: число запросов растет с данными: {counts}',
+                )
+
+    def test_plans_avoid_scans_and_temp_sorting(self):
+        for name, variants in self.requests().items():
+            allowed = ALLOWED_STEPS.get(name, set())
+            for label, settings, client, method, url, data in variants:
+                with override_settings(**settings):
+                    executed = self.measure(client, method, url, data)
+                for sql, params in executed:
+                    if not sql.startswith(STATEMENTS):
+                        continue
+                    steps = plan(sql, params)
+                    bad = [
+                        step for step in steps
+                        if (TEMP_ORDER in step or FULL_SCAN.match(step))
+                        and not allowed_step(step, allowed)
+                    ]
+                    with self.subTest(url=name, variant=label, sql=sql):
+                        self.assertFalse(
+                            bad,
+                            f'{name} ({label}):\n{sql}\n{params}\n'
+                            + '\n'.join(steps),
+                        )
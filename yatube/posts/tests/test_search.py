@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..search import filter_posts, fts_query, restore_triggers
+from ..signals import migrated
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.exact = Post.objects.create(
+            author=cls.user, text='Котики спят. Котики едят. Котики.'
+        )
+        cls.once = Post.objects.create(
+            author=cls.user,
+            text='Длинный пост про погоду, дождь, ветер и котики.',
+        )
+        cls.commented = Post.objects.create(
+            author=cls.user, text='Фотография без подписи'
+        )
+        Comment.objects.create(
+            post=cls.commented, author=cls.user, text='Тут котики <3'
+        )
+        cls.other = Post.objects.create(author=cls.user, text='Про собак')
+        cls.url = reverse('posts:search')
+
+    def search(self, **params):
+        return self.client.get(self.url, params).context['page_obj']
+
+    def test_fts_query(self):
+        self.assertEqual(fts_query('Кот "OR" пёс'), '"кот" "or" "пёс"*')
+        self.assertIsNone(fts_query(' ?! '))
+
+    def test_ranking(self):
+        page = self.search(q='котики')
+        self.assertEqual(
+            list(page), [self.exact, self.once, self.commented]
+        )
+
+    def test_prefix_and_empty_query(self):
+        self.assertEqual(set(self.search(q='кот')), {
+            self.exact, self.once, self.commented
+        })
+        response = self.client.get(self.url, {'q': '""'})
+        self.assertIsNone(response.context['page_obj'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_snippet_escaped_and_highlighted(self):
+        page = self.search(q='котики')
+        snippets = {post: post.snippet for post in page}
+        self.assertIn('<mark>Котики</mark>', snippets[self.exact])
+        self.assertEqual(
+            snippets[self.commented], 'Тут <mark>котики</mark> &lt;3'
+        )
+
+    def test_cursor_pages(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text='котики ' * (i % 5 + 1))
+            for i in range(20)
+        )
+        everything = list(self.search(q='котики').paginator.ranked(
+            limit=-1
+        ))
+        first = self.search(q='котики')
+        second = self.search(q='котики', cursor=first.paginator.next_cursor)
+        third = self.search(q='котики', cursor=second.paginator.next_cursor)
+        self.assertEqual(
+            [post.pk for post in [*first, *second, *third]],
+            [pk for pk, _ in everything],
+        )
+        self.assertFalse(third.has_next())
+        back = self.search(
+            q='котики', cursor=third.paginator.previous_cursor
+        )
+        self.assertEqual(list(back), list(second))
+
+    def test_index_follows_changes(self):
+        other = Post.objects.get(pk=self.other.pk)
+        other.text = 'Теперь тоже котики'
+        other.save()
+        Post.objects.filter(pk=self.exact.pk).delete()
+        Comment.objects.filter(post=self.commented).delete()
+        self.assertEqual(
+            set(self.search(q='котики')), {self.once, self.other}
+        )
+        self.assertEqual(list(self.search(q='собак')), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO posts_post_fts (posts_post_fts)"
+                           " VALUES ('delete-all')")
+        self.assertEqual(list(self.search(q='собак')), [])
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        self.assertIn('Post: проиндексировано 4', out.getvalue())
+        self.assertIn('Comment: проиндексировано 1', out.getvalue())
+        self.assertEqual(list(self.search(q='собак')), [self.other])
+
+    def test_triggers_restored_after_migrate(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER posts_post_fts_update')
+        Post.objects.filter(pk=self.other.pk).update(text='Про котов')
+        migrated(sender=apps.get_app_config('posts'), using='default')
+        self.assertEqual(list(self.search(q='котов')), [self.other])
+        Post.objects.filter(pk=self.other.pk).update(text='Про собак')
+        self.assertEqual(list(self.search(q='собак')), [self.other])
+        self.assertEqual(restore_triggers('default'), [])
+
+    def test_admin_search(self):
+        self.assertEqual(
+            set(filter_posts(Post.objects.all(), 'котики')),
+            {self.exact, self.once},
+        )
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собак'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.other]
+        )
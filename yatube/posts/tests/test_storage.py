@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from posts.models import Post, User
+
+from ..images import delete_unused
+from ..thumbnails import generate, prefetch_thumbnails
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TransactionTestCase):
+    """TransactionTestCase: файлы удаляются в on_commit."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name='meme.GIF', content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user,
+            text='Мем',
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def test_identical_uploads_share_file(self):
+        first = self.create_post()
+        second = self.create_post(name='repost.gif')
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        self.assertEqual(first.image.name, f'posts/{digest[:2]}/{digest}.gif')
+        self.assertEqual(second.image.name, first.image.name)
+        other = self.create_post(content=SMALL_GIF + b'\x00')
+        self.assertNotEqual(other.image.name, first.image.name)
+
+    def test_shared_thumbnails(self):
+        first = self.create_post()
+        generate(first.image.name)
+        second = self.create_post(name='repost.gif')
+        geometry_string, options = settings.POST_THUMBNAILS[0]
+        posts = [first, second]
+        prefetch_thumbnails(posts, geometry_string, **options)
+        self.assertNotEqual(first.thumbnail, first.image)
+        self.assertEqual(second.thumbnail.url, first.thumbnail.url)
+
+    def test_file_deleted_with_last_reference(self):
+        first = self.create_post()
+        second = self.create_post()
+        storage = first.image.storage
+        name = first.image.name
+        first.delete()
+        self.assertTrue(storage.exists(name))
+        second.image = SimpleUploadedFile('new.gif', SMALL_GIF + b'\x00')
+        second.save()
+        self.assertFalse(storage.exists(name))
+        self.assertTrue(storage.exists(second.image.name))
+
+    def test_reused_file_restored_after_concurrent_delete(self):
+        first = self.create_post()
+        storage = first.image.storage
+        with transaction.atomic():
+            second = self.create_post(name='repost.gif')
+            # Другой процесс удалил файл, не видя незакоммиченного поста
+            storage.delete(first.image.name)
+        self.assertTrue(storage.exists(second.image.name))
+        with storage.open(second.image.name) as restored:
+            self.assertEqual(restored.read(), SMALL_GIF)
+
+    def test_file_kept_when_reference_appears_during_delete(self):
+        post = self.create_post()
+        other = Post.objects.create(author=self.user, text='Без картинки')
+        storage = post.image.storage
+        name = post.image.name
+        Post.objects.filter(pk=post.pk).update(image='')
+        hide = storage.hide
+
+        def hide_and_commit_reference(hidden_name):
+            hidden = hide(hidden_name)
+            Post.objects.filter(pk=other.pk).update(image=name)
+            return hidden
+
+        with mock.patch.object(
+            storage, 'hide', side_effect=hide_and_commit_reference
+        ):
+            delete_unused(name)
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(os.listdir(os.path.dirname(storage.path(name))),
+                         [os.path.basename(name)])
+
+    def test_foreign_names_are_kept(self):
+        post = Post.objects.create(
+            author=self.user, text='Старый пост', image='posts/old.gif'
+        )
+        storage = post.image.storage
+        os.makedirs(storage.path('posts'), exist_ok=True)
+        with open(storage.path('posts/old.gif'), 'wb') as old:
+            old.write(SMALL_GIF)
+        post.delete()
+        self.assertTrue(storage.exists('posts/old.gif'))
@@ -0,0 +1,155 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (Client, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+from posts.models import Post, User
+from sorl.thumbnail import default
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from ..kvstore import LRU
+from ..thumbnails import generate, lookup, prefetch_thumbnails
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class LRUTests(SimpleTestCase):
+    @mock.patch('posts.kvstore.time.monotonic')
+    def test_entries_expire(self, monotonic):
+        lru = LRU(size=2, ttl=60)
+        monotonic.return_value = 100
+        lru.set_many({'a': 1, 'b': 2})
+        monotonic.return_value = 130
+        lru.set_many({'c': 3})
+        self.assertEqual(lru.get_many(['a', 'b', 'c']), {'b': 2, 'c': 3})
+        monotonic.return_value = 160
+        self.assertEqual(lru.get_many(['b', 'c']), {'c': 3})
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='thumb.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Хранилище ключей sorl держит записи и в кэше, и в базе
+        cache.clear()
+        default.kvstore.lru.clear()
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'), ignore_errors=True
+        )
+
+    def test_lookup_does_not_generate(self):
+        thumbnail = lookup.thumbnail_file(
+            self.post.image, '960x339', crop='top', upscale=True
+        )
+        prefetch_thumbnails([self.post], '960x339', crop='top', upscale=True)
+        self.assertFalse(thumbnail.exists())
+        # Промах не запомнен: миниатюру из пула увидят следующие запросы
+        self.assertIsNone(cache.get(add_prefix(thumbnail.key)))
+
+    def test_generated_thumbnails_are_used(self):
+        generate(self.post.image.name)
+        for geometry_string, options in settings.POST_THUMBNAILS:
+            with self.subTest(options=options):
+                expected = lookup.thumbnail_file(
+                    self.post.image, geometry_string, **options
+                )
+                posts = [self.post]
+                prefetch_thumbnails(posts, geometry_string, **options)
+                self.assertTrue(expected.exists())
+                self.assertEqual(posts[0].thumbnail.url, expected.url)
+
+    def test_prefetch_thumbnails_for_page(self):
+        """Миниатюры страницы ищутся одним запросом, потом в памяти."""
+        generate(self.post.image.name)
+        cache.clear()
+        default.kvstore.lru.clear()
+        posts = [self.post, Post(author=self.user, text='Без картинки')]
+        with self.assertNumQueries(1):
+            prefetch_thumbnails(posts, '960x339', crop='top', upscale=True)
+        expected = lookup.thumbnail_file(
+            self.post.image, '960x339', crop='top', upscale=True
+        )
+        self.assertEqual(posts[0].thumbnail.url, expected.url)
+        self.assertIsNone(posts[1].thumbnail)
+        cache.clear()
+        with self.assertNumQueries(0):
+            prefetch_thumbnails(posts, '960x339', crop='top', upscale=True)
+
+    def test_prefetch_falls_back_to_original_image(self):
+        posts = [self.post]
+        prefetch_thumbnails(posts, '960x339', crop='center', upscale=True)
+        self.assertEqual(posts[0].thumbnail, self.post.image)
+
+    def test_feed_renders_original_image(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ScheduleTests(TransactionTestCase):
+    """TransactionTestCase: миниатюры ставятся в очередь в on_commit."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        self.user = User.objects.create_user(username='author')
+        self.client.force_login(self.user)
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile('new.gif', SMALL_GIF, 'image/gif'),
+        })
+        return Post.objects.get(author=self.user)
+
+    def test_created_post_gets_thumbnails(self):
+        post = self.create_post()
+        for geometry_string, options in settings.POST_THUMBNAILS:
+            with self.subTest(options=options):
+                posts = [post]
+                prefetch_thumbnails(posts, geometry_string, **options)
+                self.assertNotEqual(posts[0].thumbnail, post.image)
+                self.assertTrue(posts[0].thumbnail.exists())
+
+    @override_settings(THUMBNAIL_WORKERS=2)
+    def test_created_post_is_submitted_to_pool(self):
+        with mock.patch('posts.thumbnails.get_executor') as get_executor:
+            post = self.create_post()
+        get_executor.return_value.submit.assert_called_once_with(
+            generate, post.image.name
+        )
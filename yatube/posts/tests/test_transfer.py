@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def snapshot():
+    return {
+        'groups': list(Group.objects.order_by('slug').values_list(
+            'slug', 'title', 'description', 'posts_count'
+        )),
+        'posts': list(Post.objects.order_by('pk').values_list(
+            'pk', 'author__username', 'group__slug', 'text', 'pub_date',
+            'comments_count',
+        )),
+        'comments': list(Comment.objects.order_by('pk').values_list(
+            'pk', 'post_id', 'author__username', 'text', 'created'
+        )),
+        'follows': sorted(Follow.objects.values_list(
+            'user__username', 'author__username'
+        )),
+        'timeline': sorted(TimelineEntry.objects.values_list(
+            'user__username', 'post_id', 'pub_date'
+        )),
+        'profiles': sorted(User.objects.values_list(
+            'username', 'profile__posts_count', 'profile__followers_count',
+            'profile__following_count',
+        )),
+    }
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'dump.ndjson')
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for number in range(5):
+            post = Post.objects.create(
+                author=author,
+                text=f'Пост «{number}»\nвторая строка',
+                group=group if number % 2 else None,
+            )
+            Comment.objects.create(post=post, author=reader, text='Ответ')
+        Post.objects.create(
+            author=reader,
+            text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        Follow.objects.create(user=reader, author=author)
+
+    def reset(self):
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def test_round_trip(self):
+        expected = snapshot()
+        images = os.path.join(self.directory, 'images')
+        call_command('export_posts', self.path, images=images,
+                     chunk_size=2, stderr=StringIO())
+        with open(self.path, encoding='utf-8') as stream:
+            models = [json.loads(line)['model'] for line in stream]
+        self.assertEqual(
+            models,
+            ['group'] + ['post'] * 6 + ['comment'] * 5 + ['follow'],
+        )
+        self.reset()
+        shutil.rmtree(TEMP_MEDIA_ROOT)
+        out = StringIO()
+        call_command('import_posts', self.path, images=images,
+                     batch_size=2, stdout=out, stderr=StringIO())
+        self.assertIn('Загружено: 13 строк', out.getvalue())
+        self.assertEqual(snapshot(), expected)
+        image = Post.objects.exclude(image='').get().image
+        with image.open() as stored:
+            self.assertEqual(stored.read(), SMALL_GIF)
+
+    def test_conflicting_rows(self):
+        call_command('export_posts', self.path, stderr=StringIO())
+        first = Post.objects.order_by('pk').first().pk
+        with self.assertRaisesMessage(
+            CommandError, f'ValueError: Post с id {first}, {first + 1}'
+        ):
+            call_command('import_posts', self.path,
+                         stdout=StringIO(), stderr=StringIO())
+
+    def test_unknown_model(self):
+        with open(self.path, 'w', encoding='utf-8') as stream:
+            stream.write('{"model": "like"}\n')
+        with self.assertRaisesMessage(
+            CommandError, "неизвестная модель 'like'"
+        ):
+            call_command('import_posts', self.path,
+                         stdout=StringIO(), stderr=StringIO())
+
+    def test_dates_kept(self):
+        post = Post.objects.order_by('pk').first()
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=post.pub_date.replace(year=2001)
+        )
+        Comment.objects.filter(post=post).update(
+            created=post.pub_date.replace(year=2002)
+        )
+        call_command('export_posts', self.path, stderr=StringIO())
+        self.reset()
+        call_command('import_posts', self.path,
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Post.objects.get(pk=post.pk).pub_date.year, 2001)
+        self.assertEqual(
+            Comment.objects.get(post=post.pk).created.year, 2002
+        )
+        # Импорт не трогает auto_now_add у общего поля модели
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
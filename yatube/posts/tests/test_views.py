@@ -308,3 +308,46 @@ class PostViewsTests(TestCase):
         )
         unfollowing_count = Follow.objects.filter(author=self.author).count()
         self.assertEqual(unfollowing_count, 0)
+
+
+class FeedQueriesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Некая группа',
+            slug='test_slug',
+            description='Некое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(settings.ITEMS_COUNT):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Некий пост #{i}',
+                group=cls.group,
+            )
+            cls.post.comments.create(author=cls.reader, text='Комментарий')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_do_not_query_per_post(self):
+        # Запрос постов и, где нужно, автора/группы; без запросов на пост
+        urls = {
+            reverse('posts:index'): 1,
+            reverse('posts:group_posts', args=[self.group.slug]): 2,
+            reverse('posts:profile', args=[self.author.username]): 2,
+            reverse('posts:post_detail', args=[self.post.pk]): 2,
+        }
+        for url, queries in urls.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    self.client.get(url)
+
+    def test_follow_feed_query_count(self):
+        # Сессия, пользователь и одна выборка ленты
+        with self.assertNumQueries(3):
+            self.reader_client.get(reverse('posts:follow_index'))
@@ -0,0 +1,135 @@
+import atexit
+import logging
+import multiprocessing
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+class ThumbnailLookup(ThumbnailBackend):
+    """Ищет готовую миниатюру, но никогда не создает ее."""
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        # Те же имя и параметры, что у ThumbnailBackend.get_thumbnail()
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+lookup = ThumbnailLookup()
+
+
+def prefetch_thumbnails(posts, geometry_string, **options):
+    """Проставляет post.thumbnail одним запросом к хранилищу на страницу.
+
+    Пока миниатюры нет, в post.thumbnail лежит исходная картинка.
+    """
+    files = [
+        lookup.thumbnail_file(post.image, geometry_string, **options)
+        if post.image else None
+        for post in posts
+    ]
+    ready = default.kvstore.get_many_images(filter(None, files))
+    for post, thumbnail in zip(posts, files):
+        post.thumbnail = thumbnail and ready.get(thumbnail.key, post.image)
+
+
+def generate(name):
+    """Создает все миниатюры картинки из settings.POST_THUMBNAILS."""
+    # Ключи sorl зависят от хранилища, оно должно совпасть с шаблонами
+    image = ImageFile(name, Post._meta.get_field('image').storage)
+    for geometry_string, options in settings.POST_THUMBNAILS:
+        get_thumbnail(image, geometry_string, **options)
+
+
+def _setup_worker():
+    django.setup()
+
+
+class InlineExecutor(Executor):
+    """Выполняет задачу сразу в своем процессе: THUMBNAIL_WORKERS = 0."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+
+def get_executor():
+    global _executor
+    if not settings.THUMBNAIL_WORKERS:
+        return InlineExecutor()
+    if _executor is None:
+        # spawn: воркерам не достаются соединения с базой родителя
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_setup_worker,
+        )
+    return _executor
+
+
+@atexit.register
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def schedule(post):
+    """После коммита ставит генерацию миниатюр поста в очередь пула."""
+    if post.image:
+        transaction.on_commit(lambda: submit(post))
+
+
+def submit(post):
+    global _executor
+    try:
+        future = get_executor().submit(generate, post.image.name)
+    except BrokenProcessPool:
+        # Воркер пула упал: пул больше не принимает задачи, нужен новый
+        _executor = None
+        try:
+            future = get_executor().submit(generate, post.image.name)
+        except BrokenProcessPool:
+            logger.exception('Пул миниатюр не запускается')
+            return
+    future.add_done_callback(lambda future: generated(post, future))
+
+
+def generated(post, future):
+    error = future.exception()
+    if error is not None:
+        logger.error(
+            'Не удалось создать миниатюры поста %s', post.pk, exc_info=error
+        )
+        return
+    # Ленты в кэше пока показывают исходную картинку
+    cache.post_changed(post)
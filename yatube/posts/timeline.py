@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Подписка, оформленная одновременно с публикацией, может успеть
+    добавить пост в ленту через backfill(), поэтому повторы пропускаются.
+    """
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_posts(post_ids):
+    """fan_out() для пачки постов, сохраненных без сигналов.
+
+    Записи ленты вставляются одним INSERT ... SELECT: строк в лентах
+    на порядок больше, чем постов, и создавать для них модели дорого.
+    """
+    entries = Post.objects.filter(
+        pk__in=post_ids, author__following__isnull=False
+    ).order_by().values_list('author__following__user_id', 'pk', 'pub_date')
+    sql, params = entries.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {TimelineEntry._meta.db_table}'
+            f' (user_id, post_id, pub_date) {sql}',
+            params,
+        )
+
+
+def backfill(follow):
+    """Добавляет в ленту подписчика последние посты автора."""
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL_SIZE]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=follow.user_id, post_id=pk, pub_date=date)
+            for pk, date in posts
+        ),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove(follow):
+    """Убирает посты автора из ленты бывшего подписчика."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id,
+    ).delete()
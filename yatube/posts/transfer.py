@@ -0,0 +1,245 @@
+"""Перенос постов, комментариев и подписок в формате NDJSON.
+
+Каждая строка — отдельный объект JSON с полем model. Группы идут
+первыми, затем посты, комментарии и подписки: так при импорте все
+внешние ключи уже существуют. Пользователи и группы записываются по
+username и slug, id постов и комментариев сохраняются.
+"""
+import json
+import os
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.utils.dateparse import parse_datetime
+
+from . import timeline
+from .models import Comment, Follow, Group, Post, User
+
+PROGRESS_INTERVAL = 2
+
+
+def dump(record):
+    return json.dumps(record, ensure_ascii=False, default=str) + '\n'
+
+
+def export_records(chunk_size):
+    """Записи всех моделей; строки читаются из базы пачками."""
+    groups = Group.objects.order_by('pk').values_list(
+        'slug', 'title', 'description'
+    )
+    for slug, title, description in groups.iterator(chunk_size):
+        yield {
+            'model': 'group',
+            'slug': slug,
+            'title': title,
+            'description': description,
+        }
+    posts = Post.objects.order_by('pk').values_list(
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date', 'image'
+    )
+    for pk, author, group, text, pub_date, image in posts.iterator(
+        chunk_size
+    ):
+        yield {
+            'model': 'post',
+            'id': pk,
+            'author': author,
+            'group': group,
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'image': image,
+        }
+    comments = Comment.objects.order_by('pk').values_list(
+        'pk', 'post_id', 'author__username', 'text', 'created'
+    )
+    for pk, post_id, author, text, created in comments.iterator(chunk_size):
+        yield {
+            'model': 'comment',
+            'id': pk,
+            'post': post_id,
+            'author': author,
+            'text': text,
+            'created': created.isoformat(),
+        }
+    follows = Follow.objects.order_by('pk').values_list(
+        'user__username', 'author__username'
+    )
+    for user, author in follows.iterator(chunk_size):
+        yield {'model': 'follow', 'user': user, 'author': author}
+
+
+class Progress:
+    """Печатает число строк и скорость не чаще раза в PROGRESS_INTERVAL."""
+
+    def __init__(self, write):
+        self.write = write
+        self.rows = 0
+        self.started = self.reported = time.monotonic()
+
+    @property
+    def rate(self):
+        return self.rows / max(time.monotonic() - self.started, 1e-9)
+
+    def add(self, rows):
+        self.rows += rows
+        if time.monotonic() - self.reported >= PROGRESS_INTERVAL:
+            self.reported = time.monotonic()
+            self.write(f'{self.rows} строк, {self.rate:.0f} строк/с')
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        return (
+            f'{self.rows} строк за {elapsed:.1f} с, {self.rate:.0f} строк/с'
+        )
+
+
+def restore_dates(objects, field, dates):
+    """Возвращает объектам даты из файла после bulk_create.
+
+    auto_now_add ставит при вставке текущее время, а выключать его на
+    общем для всех потоков поле модели нельзя, поэтому даты
+    записываются вторым запросом.
+    """
+    if not objects:
+        return
+    for obj, date in zip(objects, dates):
+        setattr(obj, field, date)
+    type(objects[0]).objects.bulk_update(objects, [field])
+
+
+class Importer:
+    """Сохраняет пачки записей одной модели через bulk_create.
+
+    Id пользователей и групп кэшируются по username и slug, поэтому
+    каждая пачка делает не больше одного запроса к каждой таблице.
+    Недостающие пользователи создаются без пароля. Сигналы bulk_create
+    не вызывает, поэтому ленты подписок дополняются здесь же, а
+    счетчики пересчитывает import_posts после загрузки.
+    """
+
+    def __init__(self, images=None):
+        self.images = images
+        self.storage = Post._meta.get_field('image').storage
+        self.users = {}
+        self.groups = {}
+
+    def user_ids(self, usernames):
+        missing = set(usernames) - set(self.users)
+        if missing:
+            self.users.update(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk'))
+        created = missing - set(self.users)
+        if created:
+            # Профили им создаст recount_counters после загрузки
+            User.objects.bulk_create(
+                User(username=username, password=make_password(None))
+                for username in created
+            )
+            self.users.update(User.objects.filter(
+                username__in=created
+            ).values_list('username', 'pk'))
+        return self.users
+
+    def group_ids(self, slugs):
+        missing = set(slugs) - set(self.groups) - {None}
+        if missing:
+            self.groups.update(Group.objects.filter(
+                slug__in=missing
+            ).values_list('slug', 'pk'))
+        self.groups[None] = None
+        return self.groups
+
+    def copy_image(self, name):
+        if not name or not self.images:
+            return name
+        field = Post._meta.get_field('image')
+        with open(os.path.join(self.images, name), 'rb') as source:
+            return self.storage.save(
+                field.upload_to + os.path.basename(name), File(source)
+            )
+
+    def save(self, model, records):
+        save = getattr(self, f'save_{model}', None)
+        if save is None:
+            raise ValueError(f'неизвестная модель {model!r}')
+        return save(records)
+
+    def check_new(self, model, records):
+        """id из файла сохраняются, поэтому занятые id — ошибка."""
+        taken = list(model.objects.filter(
+            pk__in=[record['id'] for record in records]
+        ).order_by('pk').values_list('pk', flat=True)[:10])
+        if taken:
+            raise ValueError(
+                f'{model.__name__} с id {", ".join(map(str, taken))} '
+                'уже есть в базе, загружайте выгрузку в пустую базу'
+            )
+
+    def save_group(self, records):
+        existing = self.group_ids(record['slug'] for record in records)
+        created = Group.objects.bulk_create(
+            Group(
+                slug=record['slug'],
+                title=record['title'],
+                description=record['description'],
+            )
+            for record in records if record['slug'] not in existing
+        )
+        # bulk_create в SQLite не возвращает id: их прочитает group_ids()
+        for group in created:
+            self.groups.pop(group.slug, None)
+        return len(records)
+
+    def save_post(self, records):
+        self.check_new(Post, records)
+        users = self.user_ids(record['author'] for record in records)
+        groups = self.group_ids(record['group'] for record in records)
+        posts = Post.objects.bulk_create(
+            Post(
+                pk=record['id'],
+                author_id=users[record['author']],
+                group_id=groups[record['group']],
+                text=record['text'],
+                image=self.copy_image(record['image']),
+            )
+            for record in records
+        )
+        restore_dates(posts, 'pub_date', [
+            parse_datetime(record['pub_date']) for record in records
+        ])
+        timeline.fan_out_posts([record['id'] for record in records])
+        return len(records)
+
+    def save_comment(self, records):
+        self.check_new(Comment, records)
+        users = self.user_ids(record['author'] for record in records)
+        comments = Comment.objects.bulk_create(
+            Comment(
+                pk=record['id'],
+                post_id=record['post'],
+                author_id=users[record['author']],
+                text=record['text'],
+            )
+            for record in records
+        )
+        restore_dates(comments, 'created', [
+            parse_datetime(record['created']) for record in records
+        ])
+        return len(records)
+
+    def save_follow(self, records):
+        users = self.user_ids(
+            username
+            for record in records
+            for username in (record['user'], record['author'])
+        )
+        follows = Follow.objects.bulk_create(
+            Follow(user_id=users[record['user']],
+                   author_id=users[record['author']])
+            for record in records
+        )
+        for follow in follows:
+            timeline.backfill(follow)
+        return len(records)
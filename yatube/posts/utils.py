@@ -1,9 +1,204 @@
+import math
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core import signing
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SALT = 'posts.cursor'
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class LazyPage(Page):
+    """Страница, строки которой читаются при первом обращении к ней.
+
+    Если лента со ссылками навигации отдается из {% cache %}, запроса
+    к постам нет совсем.
+    """
+
+    def __init__(self, paginator, load):
+        self.paginator = paginator
+        self.load = load
+        self.page = None
+
+    def loaded(self):
+        if self.page is None:
+            self.page = self.load()
+        return self.page
+
+    @property
+    def object_list(self):
+        return self.loaded().object_list
+
+    @property
+    def number(self):
+        return self.loaded().number
+
+    def has_next(self):
+        return self.loaded().has_next()
+
+    def has_previous(self):
+        return self.loaded().has_previous()
+
+
+class CursorPaginator(Paginator):
+    """Постраничная навигация по ключу (дата, id) без COUNT и OFFSET.
+
+    Неглубокие страницы ?page=N по-прежнему читаются со смещением,
+    дальше навигация идет по непрозрачным курсорам ?cursor=..., а более
+    глубокий ?page=N отвечает 404.
+    Лента всегда упорядочена по убыванию ключа.
+    """
+
+    def __init__(self, object_list, per_page,
+                 date_field='pub_date', id_field='pk'):
+        super().__init__(object_list, per_page)
+        self.date_field = date_field
+        self.id_field = id_field
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.page_key = 'page:1'
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        # Страниц "известно" ровно столько, чтобы Page.has_next()
+        # и Page.has_previous() отвечали без подсчета всей выборки.
+        return self._num_pages
+
+    def dump_key(self, value):
+        """Первая часть ключа в виде, пригодном для JSON курсора."""
+        return value.isoformat()
+
+    def load_key(self, value):
+        return parse_datetime(value)
+
+    def encode_cursor(self, obj, direction, number):
+        """Курсор на соседнюю страницу с ее номером."""
+        values = (
+            self.dump_key(getattr(obj, self.date_field)),
+            getattr(obj, self.id_field),
+            direction,
+            number,
+        )
+        return signing.dumps(values, salt=CURSOR_SALT)
+
+    def decode_cursor(self, cursor):
+        # В курсорах, выданных до появления номера, его нет
+        date, pk, direction, *number = signing.loads(cursor, salt=CURSOR_SALT)
+        date = self.load_key(date)
+        if date is None or direction not in (NEXT, PREVIOUS):
+            raise ValueError('Некорректный курсор')
+        return date, pk, direction, int(number[0]) if number else 2
+
+    def ordered(self, descending=True):
+        sign = '-' if descending else ''
+        return self.object_list.order_by(
+            sign + self.date_field, sign + self.id_field
+        )
+
+    def after(self, date, pk):
+        """Условие "строго после ключа" в порядке убывания."""
+        date_field, id_field = self.date_field, self.id_field
+        return Q(**{f'{date_field}__lte': date}) & (
+            Q(**{f'{date_field}__lt': date}) | Q(**{f'{id_field}__lt': pk})
+        )
+
+    def before(self, date, pk):
+        """Условие "строго до ключа" в порядке убывания."""
+        date_field, id_field = self.date_field, self.id_field
+        return Q(**{f'{date_field}__gte': date}) & (
+            Q(**{f'{date_field}__gt': date}) | Q(**{f'{id_field}__gt': pk})
+        )
+
+    def offset_page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = list(self.ordered()[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            # Как Paginator.get_page: за концом ленты — последняя страница
+            return self.offset_page(self.last_number(
+                self.ordered()[:bottom].count()
+            ))
+        return self.build_page(
+            rows[:self.per_page],
+            number,
+            has_previous=number > 1,
+            has_next=len(rows) > self.per_page,
+        )
+
+    def last_number(self, count):
+        return max(1, math.ceil(count / self.per_page))
+
+    def cursor_page(self, date, pk, direction, number):
+        if direction == NEXT:
+            rows = list(
+                self.ordered().filter(self.after(date, pk))
+                [:self.per_page + 1]
+            )
+            objects = rows[:self.per_page]
+            return self.build_page(
+                objects,
+                number,
+                has_previous=bool(objects),
+                has_next=len(rows) > self.per_page,
+            )
+        rows = list(
+            self.ordered(descending=False).filter(self.before(date, pk))
+            [:self.per_page + 1]
+        )
+        objects = rows[:self.per_page][::-1]
+        return self.build_page(
+            objects,
+            number,
+            has_previous=len(rows) > self.per_page,
+            has_next=bool(objects),
+        )
+
+    def build_page(self, objects, number, has_previous, has_next):
+        # Номер из курсора сбивается, если в начало ленты добавились посты
+        number = max(number, 2) if has_previous else 1
+        self._num_pages = number + 1 if has_next else number
+        if objects:
+            if has_next:
+                self.next_cursor = self.encode_cursor(
+                    objects[-1], NEXT, number + 1
+                )
+            if has_previous:
+                self.previous_cursor = self.encode_cursor(
+                    objects[0], PREVIOUS, number - 1
+                )
+        return Page(objects, number, self)
+
+    def page_from_request(self, request, lazy=True):
+        load = self.page_loader(request)
+        return LazyPage(self, load) if lazy else load()
+
+    def page_loader(self, request):
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                values = self.decode_cursor(cursor)
+            except (signing.BadSignature, TypeError, ValueError):
+                pass
+            else:
+                self.page_key = f'cursor:{cursor}'
+                return lambda: self.cursor_page(*values)
+        try:
+            number = int(request.GET.get('page', 1))
+        except (TypeError, ValueError):
+            number = 1
+        if number > settings.PAGINATOR_OFFSET_PAGES:
+            # Под старой ссылкой на глубокую страницу теперь были бы
+            # другие посты, поэтому она не подменяется ближайшей
+            raise Http404('Дальние страницы доступны только по курсору')
+        number = max(number, 1)
+        self.page_key = f'page:{number}'
+        return lambda: self.offset_page(number)
 
 
-def get_paginator(queryset, request):
-    paginator = Paginator(queryset, settings.ITEMS_COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj, paginator.count
+def get_paginator(queryset, request, lazy=True, **kwargs):
+    paginator = CursorPaginator(queryset, settings.ITEMS_COUNT, **kwargs)
+    return paginator.page_from_request(request, lazy)
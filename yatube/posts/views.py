@@ -1,18 +1,30 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db.models import F
 from django.shortcuts import get_object_or_404, redirect, render
+from core.cache import add_cache_tags
 
+from . import thumbnails
+from .cache import (INDEX_FEED, author_tag, feed_cache, feed_version,
+                    group_feed, group_tag, post_tag, profile_feed)
+from .counters import profile_of
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .search import SearchPaginator, fts_query
 from .utils import get_paginator
 
 
 def index(request):
     template = 'posts/index.html'
-    page_obj, posts_count = get_paginator(Post.objects.all(), request)
+    version = feed_version(request, INDEX_FEED)
+    page_obj = get_paginator(Post.objects.for_feed(), request)
     title = 'Главная страница'
     context = {
         'title': title,
         'page_obj': page_obj,
+        'feed_cache': feed_cache(INDEX_FEED, version, page_obj),
         'index': True
     }
     return render(request, template, context)
@@ -21,20 +33,29 @@ def index(request):
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    page_obj, posts_count = get_paginator(group.posts.all(), request)
+    version = feed_version(
+        request, group_feed(group.pk), group_tag(group.slug)
+    )
+    page_obj = get_paginator(group.posts.for_feed(), request)
     title = group.title
     context = {
         'group': group,
         'title': title,
         'page_obj': page_obj,
+        'feed_cache': feed_cache(group_feed(group.pk), version, page_obj),
     }
     return render(request, template, context)
 
 
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    page_obj, posts_count = get_paginator(author.posts.all(), request)
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
+    version = feed_version(
+        request, profile_feed(author.pk), author_tag(author.pk)
+    )
+    page_obj = get_paginator(author.posts.for_feed(), request)
     title = f'Профайл пользователя {author.username}'
     following = False
     if request.user.is_authenticated:
@@ -43,9 +64,12 @@ def profile(request, username):
             author=author).exists()
     context = {
         'author': author,
-        'posts_count': posts_count,
+        'posts_count': profile_of(author).posts_count,
         'title': title,
         'page_obj': page_obj,
+        'feed_cache': feed_cache(
+            profile_feed(author.pk), version, page_obj
+        ),
         'following': following,
     }
     return render(request, template, context)
@@ -53,13 +77,14 @@ def profile(request, username):
 
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    add_cache_tags(request, post_tag(post_id))
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    add_cache_tags(request, author_tag(post.author_id))
     title = f'Пост {post.text[:30]}'
-    author_posts = Post.objects.filter(author=post.author)
-    posts_count = author_posts.count()
+    posts_count = profile_of(post.author).posts_count
     image = post.image
     form = CommentForm()
-    comments = post.comments.all()
+    comments = post.comments.for_post()
     context = {
         'title': title,
         'post': post,
@@ -71,6 +96,24 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def search(request):
+    template = 'posts/search.html'
+    text = request.GET.get('q', '').strip()
+    query = fts_query(text)
+    page_obj = None
+    if query:
+        page_obj = SearchPaginator(
+            query, settings.ITEMS_COUNT
+        ).page_from_request(request)
+    context = {
+        'title': 'Поиск',
+        'query': text,
+        'page_obj': page_obj,
+        'page_params': urlencode({'q': text}) + '&',
+    }
+    return render(request, template, context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -81,6 +124,7 @@ def post_create(request):
         form = form.save(commit=False)
         form.author = request.user
         form.save()
+        thumbnails.schedule(form)
         return redirect('posts:profile', form.author)
     template = 'posts/create_post.html'
     context = {
@@ -92,7 +136,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
@@ -101,6 +145,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post.pk)
     template = 'posts/create_post.html'
     is_edit = True
@@ -113,7 +159,7 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = Post.objects.get(pk=post_id)
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -126,8 +172,17 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj, total_count = get_paginator(posts, request)
+    posts = Post.objects.for_feed().filter(
+        timeline_entries__user=request.user
+    ).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_id=F('timeline_entries__post'),
+    )
+    # Ленту подписок не кэшируем, поэтому страница читается сразу
+    page_obj = get_paginator(
+        posts, request, lazy=False,
+        date_field='feed_date', id_field='feed_id'
+    )
     context = {
         'page_obj': page_obj,
         'follow': True
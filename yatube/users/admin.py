@@ -0,0 +1,35 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+
+User = get_user_model()
+
+# Верхняя граница диапазона: больше любого символа в username
+PREFIX_END = '\U0010ffff'
+
+
+class UserAdmin(BaseUserAdmin):
+    """Автодополнение пользователей по началу username.
+
+    LIKE 'abc%' в SQLite не регистрозависим и не использует индекс,
+    а диапазон username >= 'abc' AND username < 'abc\\U0010ffff' читает
+    только нужный кусок уникального индекса. Так ищутся только авторы
+    и подписчики в формах постов, поиск в списке пользователей остается
+    обычным.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if not request.path.endswith('autocomplete/'):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        term = search_term.strip()
+        if term:
+            queryset = queryset.filter(
+                username__gte=term, username__lt=term + PREFIX_END
+            )
+        return queryset.order_by('username'), False
+
+
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
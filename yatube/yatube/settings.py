@@ -50,7 +50,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.TemplateProfileMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryLogMiddleware',
+    'core.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,7 +70,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -133,6 +140,71 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 ITEMS_COUNT = 10
+# Глубже этой страницы навигация идет только по курсорам
+PAGINATOR_OFFSET_PAGES = 5
+# Списки админки считают строки точно только до этого числа
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Сколько последних постов автора попадает в ленту при подписке
+TIMELINE_BACKFILL_SIZE = 200
+TIMELINE_BATCH_SIZE = 500
+
+# Миниатюры картинок постов, которые показывают шаблоны лент.
+# Они создаются в пуле процессов после сохранения поста, а при
+# THUMBNAIL_WORKERS = 0 — сразу в процессе, который сохранил пост.
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+    ('960x339', {'crop': 'top', 'upscale': True}),
+)
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+# Сколько записей о миниатюрах каждый процесс держит в памяти и сколько
+# секунд: дольше этого другие процессы не увидят удаленную миниатюру
+THUMBNAIL_LRU_SIZE = 10000
+THUMBNAIL_LRU_TTL = 60
+
+# Загрузки больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во временный файл
+# кусками, а не держатся в памяти воркера
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024
+FILE_UPLOAD_PERMISSIONS = 0o644
+# Картинки постов: лимиты проверяются до декодирования,
+# хранится уменьшенная копия без EXIF
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+POST_IMAGE_MAX_SIDE = 2048
+POST_IMAGE_JPEG_QUALITY = 85
+
+# Server-Timing и гистограммы запросов для /metrics
+METRICS_ENABLED = True
+# Доля запросов, в которых время рендеринга разбивается по шаблонам,
+# тегам и фильтрам (0 — выключено), и сколько из них попадет в
+# Server-Timing ответа
+TEMPLATE_PROFILE_RATE = 0
+TEMPLATE_PROFILE_TOP = 10
+# cProfile запроса с подписанной меткой со страницы /profiles/. Профили
+# лежат вне MEDIA_ROOT: медиа раздаются всем. Лимит общий для воркеров,
+# только если у них общий кэш (YATUBE_CACHE_PATH), иначе check --deploy
+# предупреждает core.W001.
+PROFILE_ROOT = os.path.join(BASE_DIR, 'profiles')
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_SAMPLE_RATE = 1.0
+PROFILE_RATE_LIMIT = 10
+PROFILE_RATE_WINDOW = 60
+PROFILE_KEEP = 50
+PROFILE_TOP = 40
+# Журнал SQL-запросов view для manage.py slowqueries. Файл общий для
+# всех воркеров; без YATUBE_SLOW_QUERY_LOG журнал не ведется.
+SLOW_QUERY_LOG = os.environ.get('YATUBE_SLOW_QUERY_LOG')
+# Для запросов дольше порога (в секундах) сохраняется план и место вызова
+SLOW_QUERY_THRESHOLD = 0.05
+SLOW_QUERY_FLUSH_INTERVAL = 10
+# Один и тот же SQL-запрос больше NPLUSONE_THRESHOLD раз за HTTP-запрос
+# считается N+1 и пишется в лог, а с NPLUSONE_RAISE — исключение.
+# None выключает проверку; тесты (core.testing) включают ее всегда.
+NPLUSONE_THRESHOLD = None
+NPLUSONE_RAISE = False
+
+TEST_RUNNER = 'core.testing.TestRunner'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -146,8 +218,22 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Ленты версионируются и сбрасываются при изменении постов,
+# поэтому фрагменты можно держать в кэше долго
+FEED_CACHE_TTL = 60 * 5
+# Страницы для анонимных читателей сбрасываются по тегам
+PAGE_CACHE_TTL = 60 * 10
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+# У каждого воркера gunicorn свой LocMemCache: сброс версий в одном
+# не виден остальным. При нескольких воркерах укажите файл общего кэша.
+if os.environ.get('YATUBE_CACHE_PATH'):
+    CACHES['default'] = {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.environ['YATUBE_CACHE_PATH'],
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
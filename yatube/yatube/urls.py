@@ -16,12 +16,18 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import metrics, profile_file, profiles, profiles_cookie
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('admin/', admin.site.urls, name='admin'),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('metrics', metrics, name='metrics'),
+    path('profiles/', profiles, name='profiles'),
+    path('profiles/cookie/', profiles_cookie, name='profiles_cookie'),
+    path('profiles/<str:name>', profile_file, name='profile_file'),
 ]
 
 handler404 = 'core.views.page_not_found'